@@ -0,0 +1,62 @@
+# Measures time of generating C++ code (without compilation) for large
+# expressions. Usage: python benchmarks/codegen.py [repeat]
+
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)),
+                                "..", "src"))
+
+from qit import Qit, Int, Range, Product, Function, System, Vector
+from qit.build.builder import CppBuilder
+from qit.base.utils import bind_arguments
+
+
+def product_query():
+    p = Product(*((Range(i + 2), "x{}".format(i)) for i in range(10)))
+    f = Function().takes(p.type, "p").returns(Int()).code(
+        "return {};".format(" + ".join("p.x{}".format(i) for i in range(10))))
+    return p.iterate().map(f).filter(
+        Function().takes(Int(), "v").returns(Int()).code("return v % 2;"))
+
+
+def system_query():
+    rules = []
+    for i in range(200):
+        if i % 2:
+            rules.append(Function().takes(Int(), "x").returns(Int()).code(
+                "return x + {};".format(i)))
+        else:
+            rules.append(
+                Function().takes(Int(), "x").returns(Vector(Int())).code(
+                    "if (x % {0}) return {{}}; "
+                    "else return {{ x + 1, x * {0} }};".format(i + 2)))
+    s = System(Int().values(1, 2, 3), rules)
+    return s.states(3).iterate().take(100)
+
+
+def codegen(make_query):
+    qit = Qit()
+    start = time.time()
+    obj, args = bind_arguments(make_query(), None)
+    builder = CppBuilder(qit.env)
+    builder.build_collect(obj, args)
+    text = builder.get_string()
+    return time.time() - start, len(text)
+
+
+def main():
+    repeat = int(sys.argv[1]) if len(sys.argv) > 1 else 5
+    for name, make_query in (("product10", product_query),
+                             ("system200", system_query)):
+        times = []
+        for i in range(repeat):
+            t, size = codegen(make_query)
+            times.append(t)
+        print("{:<10} best {:.4f}s  mean {:.4f}s  ({} bytes)".format(
+            name, min(times), sum(times) / len(times), size))
+
+
+if __name__ == "__main__":
+    main()
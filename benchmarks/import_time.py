@@ -0,0 +1,35 @@
+# Measures time of importing qit in a fresh interpreter.
+# Usage: python benchmarks/import_time.py [repeat]
+
+import os
+import subprocess
+import sys
+import time
+
+SRC_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "src")
+
+STATEMENTS = (
+    ("python", "pass"),
+    ("import", "import qit"),
+    ("domains", "from qit import Range, Product, Function, Int"),
+    ("qit", "from qit import Qit; Qit(build_dir='/tmp/qit-import-time')"),
+)
+
+
+def measure(statement):
+    env = dict(os.environ, PYTHONPATH=SRC_DIR)
+    start = time.time()
+    subprocess.check_call((sys.executable, "-c", statement), env=env)
+    return time.time() - start
+
+
+def main():
+    repeat = int(sys.argv[1]) if len(sys.argv) > 1 else 10
+    for name, statement in STATEMENTS:
+        times = [ measure(statement) for i in range(repeat) ]
+        print("{:<8} best {:.4f}s  mean {:.4f}s".format(
+            name, min(times), sum(times) / len(times)))
+
+
+if __name__ == "__main__":
+    main()
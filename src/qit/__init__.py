@@ -1,26 +1,53 @@
+import importlib
+import sys
 
-from qit.base.qit import Qit
-
-# Basic
-from qit.base.variable import Variable
-from qit.base.function import Function
-
-# Types
-from qit.base.bool import Bool
-from qit.base.enum import Enum
-from qit.base.int import Int
-from qit.base.set import Set
-from qit.base.struct import Struct
-from qit.base.vector import Vector
-from qit.base.map import Map
-
-# Domains
-from qit.domains.domain import Domain
-from qit.domains.range import Range
-from qit.domains.product import Product
-from qit.domains.sequence import Sequence
-from qit.domains.values import Values
-from qit.domains.enumerate import Enumerate
-
-# Others
-from qit.domains.system import System
+# Lazy imports below (and in qit.functions) need module __getattr__
+if sys.version_info < (3, 7):
+    raise ImportError("qit requires Python 3.7 or newer")
+
+# Public names are imported on the first use (see __getattr__),
+# hence "import qit" does not load modules that are not needed
+EXPORTS = {
+    "Qit": "qit.base.qit",
+    "register": "qit.base.registry",
+
+    # Basic
+    "Variable": "qit.base.variable",
+    "Function": "qit.base.function",
+
+    # Types
+    "Bool": "qit.base.bool",
+    "Enum": "qit.base.enum",
+    "Int": "qit.base.int",
+    "Set": "qit.base.set",
+    "Struct": "qit.base.struct",
+    "Vector": "qit.base.vector",
+    "Map": "qit.base.map",
+
+    # Domains
+    "Domain": "qit.domains.domain",
+    "Range": "qit.domains.range",
+    "Product": "qit.domains.product",
+    "Sequence": "qit.domains.sequence",
+    "Values": "qit.domains.values",
+    "Enumerate": "qit.domains.enumerate",
+
+    # Others
+    "System": "qit.domains.system",
+}
+
+__all__ = list(EXPORTS)
+
+
+def __getattr__(name):
+    module = EXPORTS.get(name)
+    if module is None:
+        raise AttributeError(
+            "module {!r} has no attribute {!r}".format(__name__, name))
+    value = getattr(importlib.import_module(module), name)
+    globals()[name] = value
+    return value
+
+
+def __dir__():
+    return sorted(set(globals()) | set(EXPORTS))
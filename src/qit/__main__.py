@@ -0,0 +1,52 @@
+from qit.base.qit import Qit
+from qit.base.registry import get_registered_queries
+
+import argparse
+import importlib
+import os
+import sys
+
+
+def build(args):
+    sys.path.insert(0, os.getcwd())
+    for module in args.modules:
+        importlib.import_module(module)
+    queries = get_registered_queries()
+    qit = Qit(source_dir=args.source_dir,
+              build_dir=args.build_dir,
+              verbose=args.verbose,
+              execution=args.execution,
+              march=args.march)
+    bundle = qit.build_bundle(args.output, queries, args.jobs)
+    print("{} queries, {} programs written into {}".format(
+        len(queries), len(bundle.programs), bundle.directory))
+
+
+def main():
+    parser = argparse.ArgumentParser(prog="python -m qit")
+    subparsers = parser.add_subparsers(dest="command")
+    subparsers.required = True
+
+    p = subparsers.add_parser(
+        "build",
+        help="Compile queries registered by modules into a bundle")
+    p.add_argument("modules", nargs="+", metavar="MODULE")
+    p.add_argument("-o", "--output", default="qit-bundle")
+    p.add_argument("-j", "--jobs", type=int, default=None)
+    p.add_argument("--source-dir", default=".")
+    p.add_argument("--build-dir", default="./qit-build")
+    p.add_argument("--execution",
+                   choices=("process", "library"),
+                   default="process")
+    # Bundles are usually run on other machines than they are built on
+    p.add_argument("--march", default="x86-64",
+                   help="target of programs (default: %(default)s)")
+    p.add_argument("-v", "--verbose", type=int, default=None)
+    p.set_defaults(function=build)
+
+    args = parser.parse_args()
+    args.function(args)
+
+
+if __name__ == "__main__":
+    main()
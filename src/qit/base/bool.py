@@ -25,8 +25,20 @@ class Bool(Type):
             return None
         return self.struct.unpack(data)[0]
 
+    def write(self, f, value):
+        f.write(self.struct.pack(value))
+
     @property
     def write_function(self):
         f = self.prepare_write_function()
         f.code("fwrite(&value, sizeof(value), 1, output);")
         return f
+
+    @property
+    def read_function(self):
+        f = self.prepare_read_function()
+        f.code("fread(&value, sizeof(value), 1, input);")
+        return f
+
+    def __repr__(self):
+        return "Bool()"
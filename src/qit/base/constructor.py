@@ -14,6 +14,9 @@ class Constructor(Expression):
     def is_constructor(self):
         return True
 
+    def evaluate(self, values=None, wrap=True):
+        return self.type.evaluate_value(self.value, values)
+
     @property
     def childs(self):
         return (self.type,) + self.type.childs_from_value(self.value)
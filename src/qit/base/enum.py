@@ -25,15 +25,27 @@ class Enum(Type):
             return None
         return self.names[self.struct.unpack(data)[0]]
 
+    def write(self, f, value):
+        f.write(self.struct.pack(self.names.index(value)))
+
     @property
     def write_function(self):
         f = self.prepare_write_function()
         f.code("fwrite(&value, sizeof(value), 1, output);")
         return f
 
+    @property
+    def read_function(self):
+        f = self.prepare_read_function()
+        f.code("fread(&value, sizeof(value), 1, input);")
+        return f
+
     def is_python_instance(self, obj):
         return isinstance(obj, str)
 
+    def sort_key(self, value):
+        return self.names.index(value)
+
     def declare(self, builder):
         if builder.check_declaration_key(self):
             return
@@ -1,9 +1,21 @@
 
+# Values derived from object graphs (hashes, results of traversals) are
+# cached in objects. Objects are mutable (e.g. Function is configured by
+# chained calls), and a change of an object may change values cached in any
+# object that contains it. Hence a change of an object that was already used
+# for a cached value invalidates all caches by increasing the generation.
+# Changes of freshly created objects (the common case) invalidate nothing.
+GENERATION = [0]
+
+
 class EqMixin(object):
 
+    __slots__ = ()
+
     def __eq__(self, other):
-        return (isinstance(other, self.__class__)
-            and self.__dict__ == other.__dict__)
+        return (self is other or
+                (isinstance(other, self.__class__)
+                 and self.__dict__ == other.__dict__))
 
     def __ne__(self, other):
         return not self.__eq__(other)
@@ -11,5 +23,33 @@ class EqMixin(object):
 
 class HashableEqMixin(EqMixin):
 
+    __slots__ = ("_cache",)
+
+    def get_cache(self):
+        cache = getattr(self, "_cache", None)
+        if cache is None or cache[0] != GENERATION[0]:
+            cache = (GENERATION[0], {})
+            object.__setattr__(self, "_cache", cache)
+        return cache[1]
+
+    def __setattr__(self, name, value):
+        cache = getattr(self, "_cache", None)
+        if cache is not None:
+            if cache[0] == GENERATION[0]:
+                GENERATION[0] += 1
+            object.__setattr__(self, "_cache", None)
+        object.__setattr__(self, name, value)
+
+    def __copy__(self):
+        # Caches are not copied
+        obj = self.__class__.__new__(self.__class__)
+        obj.__dict__.update(self.__dict__)
+        return obj
+
     def __hash__(self):
-        return hash(tuple(sorted(self.__dict__.items())))
+        cache = self.get_cache()
+        h = cache.get("hash")
+        if h is None:
+            h = hash(tuple(sorted(self.__dict__.items())))
+            cache["hash"] = h
+        return h
@@ -14,3 +14,30 @@ class MissingFiles(QitException):
     def __init__(self, message, filenames):
         super().__init__(message)
         self.filenames = filenames
+
+
+class CompilationFailed(QitException):
+
+    def __init__(self, filename, output):
+        super().__init__("Compilation of {} failed:\n{}".format(
+            filename, output))
+        self.filename = filename
+        self.output = output
+
+
+class BatchFailed(QitException):
+
+    def __init__(self, results, errors):
+        super().__init__("{} item(s) failed: {}".format(
+            len(errors), ", ".join(str(i) for i in sorted(errors))))
+        self.results = results
+        self.errors = errors
+
+
+class NotConstant(QitException):
+
+    def __init__(self, expression):
+        super().__init__(
+            "{} cannot be evaluated without running a program".format(
+                repr(expression)))
+        self.expression = expression
@@ -1,5 +1,6 @@
 
 from qit.base.qitobject import QitObject
+from qit.base.exception import NotConstant
 
 class Expression(QitObject):
 
@@ -16,6 +17,12 @@ class Expression(QitObject):
     def is_constructor(self):
         return False
 
+    def evaluate(self, values=None, wrap=True):
+        # Computes the value of expression in Python; 'values' maps names
+        # of variables to their values, results of functions overflow
+        # as in C++ unless 'wrap' is False
+        raise NotConstant(self)
+
     def write_into_variable(self, builder):
         return builder.write_expression_into_variable(self)
 
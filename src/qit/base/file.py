@@ -8,4 +8,5 @@ class File(Type):
     def build(self, builder):
         return "FILE*"
 
-
+    def __repr__(self):
+        return "File()"
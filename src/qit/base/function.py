@@ -1,5 +1,6 @@
 
 from qit.base.qitobject import QitObject
+from qit.base.exception import NotConstant, QitException
 from qit.base.expression import Expression
 from qit.base.utils import validate_variables, sorted_variables
 from qit.base.eqmixin import HashableEqMixin
@@ -26,6 +27,10 @@ class Function(QitObject):
         self.inline_code = None
         self.inline_code_vars = ()
         self.used_expressions = ()
+        self.headers = ()
+        self.python_function = None
+        self.pure = False
+        self.side_effect_free = False
 
     def is_function(self):
         return True
@@ -46,10 +51,34 @@ class Function(QitObject):
         self.external_file = None
         return self
 
+    def evaluates(self, python_function, pure=True):
+        # Python implementation of the function; calls of a pure function
+        # with constant arguments are replaced by constants
+        self.python_function = python_function
+        self.pure = pure
+        return self
+
+    def call_python(self, *args):
+        # Results are wrapped as in C++, e.g. Int overflows as qint does
+        return self.return_type.wrap_value(self.python_function(*args))
+
+    def deterministic(self):
+        # Calls with the same arguments always return the same value and
+        # have no side effects, hence generated code may cache them
+        self.side_effect_free = True
+        return self
+
+    def is_deterministic(self):
+        return self.side_effect_free or self.pure
+
     def reads(self, *variables):
         self.uses(variables)
         return self
 
+    def includes(self, *headers):
+        self.headers += headers
+        return self
+
     def from_file(self, filename):
         self.filename = filename
         return self
@@ -84,7 +113,20 @@ class Function(QitObject):
                    self.inline_code, self.inline_code_vars)
 
     def __call__(self, *args):
-        return FunctionCall(self, args)
+        call = FunctionCall(self, args)
+        if self.pure and all(a.is_constructor() for a in call.args):
+            # Calls that fail or overflow are not folded; errors are left
+            # to the generated code and exact values remain available
+            try:
+                value = call.evaluate(wrap=False)
+            except QitException:
+                return call
+            if self.return_type.wrap_value(value) == value:
+                return self.return_type.value(value)
+        return call
+
+    def __repr__(self):
+        return "Function({})".format(repr(self.name))
 
 
 class FunctionCall(Expression):
@@ -104,6 +146,25 @@ class FunctionCall(Expression):
     def childs(self):
         return super().childs + self.args + (self.function,)
 
+    def evaluate(self, values=None, wrap=True):
+        if self.function.python_function is None:
+            return super().evaluate(values, wrap)
+        args = [a.evaluate(values, wrap) for a in self.args]
+        try:
+            value = self.function.python_function(*args)
+        except ArithmeticError:
+            # E.g. division by zero; it is left to the generated code
+            raise NotConstant(self)
+        if wrap:
+            return self.type.wrap_value(value)
+        return value
+
+    def is_deterministic(self):
+        # Parameters passed by reference may be modified by the call
+        return self.type is not None and \
+            all(p.const for p in self.function.params) and \
+            all(f.is_deterministic() for f in self.get_functions())
+
     def build(self, builder):
         return builder.build_function_call(self)
 
@@ -119,6 +180,8 @@ class FunctionFromExpression(Function):
             self.takes(v.type, v.name)
         self.returns(expression.type)
         self.expression = expression
+        # Only calls in the expression may have side effects
+        self.side_effect_free = True
 
     @property
     def bounded_variables(self):
@@ -2,6 +2,12 @@
 from qit.base.type import Type
 import struct
 
+
+def wrap_int(value):
+    # Python integers are unbounded, qint is 32-bit and wraps around
+    return (value + 2 ** 31) % 2 ** 32 - 2 ** 31
+
+
 class Int(Type):
 
     pass_by_value = True
@@ -22,14 +28,26 @@ class Int(Type):
             return None
         return self.struct.unpack(data)[0]
 
+    def write(self, f, value):
+        f.write(self.struct.pack(value))
+
     @property
     def write_function(self):
         f = self.prepare_write_function()
         f.code("fwrite(&value, sizeof(value), 1, output);")
         return f
 
+    @property
+    def read_function(self):
+        f = self.prepare_read_function()
+        f.code("fread(&value, sizeof(value), 1, input);")
+        return f
+
     def is_python_instance(self, obj):
         return isinstance(obj, int)
 
+    def wrap_value(self, value):
+        return wrap_int(value)
+
     def __repr__(self):
         return "Int()"
@@ -4,6 +4,8 @@ from qit.base.type import Type
 
 class Map(Type):
 
+    headers = ("map",)
+
     def __init__(self, key_type, value_type):
         self.name = None
 
@@ -17,6 +19,13 @@ class Map(Type):
     def childs_from_value(self, value):
         return tuple(v[0] for v in value) + tuple(v[1] for v in value)
 
+    def evaluate_value(self, value, values=None):
+        return dict((k.evaluate(values), v.evaluate(values)) for k, v in value)
+
+    def sort_key(self, value):
+        return sorted((self.key_type.sort_key(k), self.value_type.sort_key(v))
+                      for k, v in value.items())
+
     def build(self, builder):
         return "std::map<{}, {} >".format(self.key_type.build(builder),
                                           self.value_type.build(builder))
@@ -26,6 +35,12 @@ class Map(Type):
         return dict((self.key_type.read(f), self.value_type.read(f))
                  for i in range(size))
 
+    def write(self, f, value):
+        Int().write(f, len(value))
+        for k, v in value.items():
+            self.key_type.write(f, k)
+            self.value_type.write(f, v)
+
     @property
     def write_function(self):
         f = self.prepare_write_function();
@@ -40,6 +55,24 @@ class Map(Type):
              write_int=Int().write_function)
         return f
 
+    @property
+    def read_function(self):
+        f = self.prepare_read_function()
+        f.code("""
+        qint size;
+        {{read_int}}(input, size);
+        value.clear();
+        for (qint i = 0; i < size; i++) {
+            {{key_type}} key;
+            {{key_read}}(input, key);
+            {{value_read}}(input, value[key]);
+        }
+        """, key_read=self.key_type.read_function,
+             value_read=self.value_type.read_function,
+             read_int=Int().read_function,
+             key_type=self.key_type)
+        return f
+
     def is_python_instance(self, obj):
         return isinstance(obj, dict)
 
@@ -3,3 +3,5 @@ import os
 
 QIT_DIR = os.path.dirname(os.path.dirname(__file__))
 SRC_DIR = os.path.dirname(QIT_DIR)
+RUNTIME_DIR = os.path.join(QIT_DIR, "runtime")
+RUNTIME_HEADER = os.path.join(RUNTIME_DIR, "qit_runtime.hpp")
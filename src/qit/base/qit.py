@@ -1,6 +1,9 @@
-from qit.build.env import CppEnv
-from qit.base.utils import validate_variables, assign_values
+from qit.base.utils import bind_arguments, bind_arguments_multi
+from qit.base.utils import bind_iterator_arguments
+from qit.base.utils import validate_variables
 from qit.base.qitobject import check_qit_object
+from qit.base.registry import get_registered_queries
+from qit.base.exception import QitException, NotConstant
 
 import logging
 
@@ -13,11 +16,44 @@ class Qit:
                  build_dir="./qit-build",
                  verbose=None,
                  create_files=False,
-                 debug=False):
+                 debug=False,
+                 cache_size=256 * 1024 * 1024,
+                 precompiled_header=True,
+                 execution="process",
+                 tiered=False,
+                 tier_runs=2,
+                 tier_threshold=0.5,
+                 pgo=False,
+                 separate_compilation=False,
+                 translation_units=1,
+                 bundle=None,
+                 march=None,
+                 max_compiles=None,
+                 max_runs=None,
+                 backend="cpp",
+                 python_limit=10000):
         self.debug = debug
+        self.cache_size = cache_size
+        self.precompiled_header = precompiled_header
+        self.execution = execution
+        self.tiered = tiered
+        self.tier_runs = tier_runs
+        self.tier_threshold = tier_threshold
+        self.pgo = pgo
+        self.separate_compilation = separate_compilation
+        self.translation_units = translation_units
+        self.bundle = bundle
+        self.march = march
+        self.max_compiles = max_compiles
+        self.max_runs = max_runs
+        if backend not in ("cpp", "python", "auto"):
+            raise QitException("Invalid backend '{}'".format(backend))
+        self.backend = backend
+        self.python_limit = python_limit
         self.source_dir = source_dir
         self.build_dir = build_dir
         self.auto_create_files = create_files
+        from qit.build.env import CppEnv
         self.env = CppEnv(self)
 
         log_level = None
@@ -34,14 +70,68 @@ class Qit:
             logging.basicConfig(format="%(levelname)s: %(message)s",
                                 level=log_level)
 
-    def run(self, obj, args=None):
+    def run(self, obj, args=None, pgo=None, training_args=None):
+        if pgo is None:
+            pgo = self.pgo
+        if pgo:
+            query = self.prepare(obj, pgo=True, training_args=training_args)
+            return query.run(args)
+        if self.backend != "cpp":
+            from qit.build.interpreter import Interpreter
+            limit = self.python_limit if self.backend == "auto" else None
+            try:
+                return Interpreter(limit).run(obj, args)
+            except NotConstant as e:
+                LOG.debug("Falling back to C++: %s", e)
+        return self.env.run_collect(*bind_arguments(obj, args))
+
+    async def run_async(self, obj, args=None):
+        return await self.env.run_async(*bind_arguments(obj, args))
+
+    def iterate(self, obj, args=None):
+        return self.env.iterate(*bind_iterator_arguments(obj, args))
+
+    def iterate_async(self, obj, args=None):
+        return self.env.iterate_async(*bind_iterator_arguments(obj, args))
+
+    def sweep(self, obj, bindings):
+        obj = obj.get_expression()
+        validate_variables(obj.get_variables())
+        return self.env.sweep(obj, list(bindings))
+
+    def run_multi(self, objs, args=None):
+        return self.env.run_multi(*bind_arguments_multi(objs, args))
+
+    def prepare(self, obj, pgo=None, training_args=None):
+        if pgo is None:
+            pgo = self.pgo
         obj = obj.get_expression()
-        variables = obj.get_variables()
-        validate_variables(variables)
-        if args is None:
-            args = {}
-        return self.env.run_collect(obj,
-                                    assign_values(variables, args))
+        validate_variables(obj.get_variables())
+        return self.env.prepare(obj, pgo, training_args)
+
+    def run_many(self, items, jobs=None):
+        return self.env.run_many(items, jobs)
+
+    def build_bundle(self, directory, queries=None, jobs=None):
+        if queries is None:
+            queries = get_registered_queries()
+        return self.env.build_bundle(queries, directory, jobs)
+
+    def tier_stats(self):
+        if self.env.tiers is None:
+            return {}
+        return self.env.tiers.get_stats()
+
+    def wait_for_tiers(self):
+        if self.env.tiers is not None:
+            self.env.tiers.wait()
+
+    def explain(self, obj, args=None, file=None):
+        from qit.build.explain import Explanation
+        check_qit_object(obj)
+        text = Explanation(self.env, obj, args).get_text()
+        print(text, file=file)
+        return text
 
     def declarations(self, obj):
         check_qit_object(obj)
@@ -7,6 +7,7 @@ class QitObject(HashableEqMixin):
     childs = ()
     bounded_variables = frozenset()
     autoname_prefix = "QitObject"
+    headers = ()
 
     def is_type(self):
         return False
@@ -21,16 +22,35 @@ class QitObject(HashableEqMixin):
         return False
 
     def get_objects(self):
-        result = frozenset((self,))
-        for child in self.childs:
-            result = result.union(child.get_objects())
+        cache = self.get_cache()
+        result = cache.get("objects")
+        if result is None:
+            result = set()
+            stack = [self]
+            while stack:
+                obj = stack.pop()
+                if obj not in result:
+                    result.add(obj)
+                    stack.extend(obj.childs)
+            result = frozenset(result)
+            cache["objects"] = result
         return result
 
     def get_variables(self):
-        result = frozenset()
-        for child in self.childs:
-            result = result.union(child.get_variables())
-        return result.difference(self.bounded_variables)
+        cache = self.get_cache()
+        result = cache.get("variables")
+        if result is None:
+            result = frozenset().union(
+                *(child.get_variables() for child in self.childs))
+            result = result.difference(self.bounded_variables)
+            cache["variables"] = result
+        return result
+
+    def get_headers(self):
+        headers = set()
+        for obj in self.get_objects():
+            headers.update(obj.headers)
+        return headers
 
     def get_functions(self):
         return [ obj for obj in self.get_objects()
@@ -48,9 +68,12 @@ class QitObject(HashableEqMixin):
         pass
 
     def declare_all(self, builder):
+        # Shared subgraphs are visited only once
+        if builder.is_visited(self):
+            return
         for child in self.childs:
             child.declare_all(builder)
-        self.declare(builder)
+        builder.declare_object(self)
 
     def copy(self):
         return copy(self)
@@ -0,0 +1,11 @@
+
+# Queries registered by user modules; they are compiled ahead of time
+# by "python -m qit build"
+QUERIES = []
+
+def register(obj, args=None):
+    QUERIES.append((obj, args))
+    return obj
+
+def get_registered_queries():
+    return list(QUERIES)
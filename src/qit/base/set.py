@@ -1,9 +1,11 @@
 from qit.base.type import Type
 from qit.base.int import Int
-import collections
+import collections.abc
 
 class Set(Type):
 
+    headers = ("set",)
+
     def __init__(self, element_type):
         super().__init__()
         self.element_type = element_type
@@ -22,9 +24,20 @@ class Set(Type):
             return None
         return set(self.element_type.read(f) for i in range(size))
 
+    def write(self, f, value):
+        Int().write(f, len(value))
+        for v in value:
+            self.element_type.write(f, v)
+
     def childs_from_value(self, value):
         return value
 
+    def evaluate_value(self, value, values=None):
+        return set(v.evaluate(values) for v in value)
+
+    def sort_key(self, value):
+        return sorted(self.element_type.sort_key(v) for v in value)
+
     @property
     def write_function(self):
         f = self.prepare_write_function()
@@ -37,12 +50,32 @@ class Set(Type):
              write_function=self.element_type.write_function)
         return f
 
+    @property
+    def read_function(self):
+        f = self.prepare_read_function()
+        f.code("""
+        qint size;
+        {{read_int}}(input, size);
+        value.clear();
+        for (qint i = 0; i < size; i++) {
+            {{type}} item;
+            {{read_function}}(input, item);
+            value.insert(item);
+        }
+        """, read_int=Int().read_function,
+             read_function=self.element_type.read_function,
+             type=self.element_type)
+        return f
+
     def build_value(self, builder, value):
         args = ",".join(v.build(builder) for v in value)
         return "{{ {} }}".format(args)
 
     def is_python_instance(self, obj):
-        return isinstance(obj, collections.Iterable)
+        return isinstance(obj, collections.abc.Iterable)
 
     def transform_python_instance(self, obj):
         return tuple(self.element_type.value(v) for v in obj)
+
+    def __repr__(self):
+        return "Set({})".format(repr(self.element_type))
@@ -37,6 +37,12 @@ class Struct(Type):
     def childs_from_value(self, value):
         return value
 
+    def evaluate_value(self, value, values=None):
+        return tuple(v.evaluate(values) for v in value)
+
+    def sort_key(self, value):
+        return tuple(t.sort_key(v) for t, v in zip(self.types, value))
+
     def declare(self, builder):
         builder.declare_struct(self)
 
@@ -54,6 +60,10 @@ class Struct(Type):
             lst.append(element)
         return tuple(lst)
 
+    def write(self, f, value):
+        for t, v in zip(self.types, value):
+            t.write(f, v)
+
     @property
     def write_function(self):
         functions = tuple(t.write_function for t in self.types)
@@ -66,6 +76,18 @@ class Struct(Type):
         f.uses(functions)
         return f
 
+    @property
+    def read_function(self):
+        functions = tuple(t.read_function for t in self.types)
+        f = self.prepare_read_function()
+        f.code("""
+        {%- for name, f in _names_and_functions %}
+            {{b(f)}}(input, value.{{name}});
+        {%- endfor %}
+        """, _names_and_functions=tuple(zip(self.names, functions)))
+        f.uses(functions)
+        return f
+
     def build_value(self, builder, value):
         assert len(value) == len(self.types)
         args = ",".join(v.build(builder)
@@ -36,6 +36,18 @@ class Type(QitObject):
     def childs_from_value(self, value):
         return ()
 
+    # Python value of a constructor (as returned by 'read')
+    def evaluate_value(self, value, values=None):
+        return value
+
+    # Python value converted as the generated code would store it
+    def wrap_value(self, value):
+        return value
+
+    # Key that orders Python values as the generated code orders them
+    def sort_key(self, value):
+        return value
+
     def values(self, *args):
         from qit.domains.values import Values
         return Values(self, args)
@@ -45,6 +57,11 @@ class Type(QitObject):
         from qit.base.file import File
         return Function().takes(File(), "output").takes(self, "value")
 
+    def prepare_read_function(self):
+        from qit.base.function import Function
+        from qit.base.file import File
+        return Function().takes(File(), "input").takes(self, "value", False)
+
     def build_param(self, builder, name, const=True):
         if not const:
             s = "{} &{}"
@@ -55,7 +72,5 @@ class Type(QitObject):
         return s.format(self.build(builder), name)
 
     def __mul__(self, other):
+        from qit.base.struct import Struct
         return Struct(self, other)
-
-
-from qit.base.struct import Struct
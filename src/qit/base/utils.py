@@ -23,6 +23,47 @@ def assign_values(variables, args):
         result[v] = v.type.value(args[v.name])
     return result
 
+def bind_arguments(obj, args):
+    obj = obj.get_expression()
+    variables = obj.get_variables()
+    validate_variables(variables)
+    if args is None:
+        args = {}
+    return obj, assign_values(variables, args)
+
+def write_arguments(f, variables, args):
+    values = assign_values(variables, args)
+    for variable in sorted_variables(variables):
+        if not values[variable].is_constructor():
+            raise QitException(
+                "Variable '{}' of a prepared query has to be bound "
+                "to a value, not to {}".format(variable.name,
+                                               args[variable.name]))
+        variable.type.write(f, args[variable.name])
+
+def bind_iterator_arguments(obj, args):
+    from qit.domains.domain import Domain
+    from qit.domains.iterator import Iterator
+    if isinstance(obj, Domain):
+        obj = obj.iterate()
+    if not isinstance(obj, Iterator):
+        raise QitException("Iterator expected, got {}".format(obj))
+    variables = obj.get_variables()
+    validate_variables(variables)
+    if args is None:
+        args = {}
+    return obj, assign_values(variables, args)
+
+def bind_arguments_multi(objs, args):
+    objs = dict((name, obj.get_expression()) for name, obj in objs.items())
+    variables = set()
+    for obj in objs.values():
+        variables.update(obj.get_variables())
+    validate_variables(variables)
+    if args is None:
+        args = {}
+    return objs, assign_values(variables, args)
+
 def is_valid_name(value):
     if not isinstance(value, str) or len(value) == 0:
         return False
@@ -31,5 +72,4 @@ def is_valid_name(value):
     return all(c.isalnum() or value == "_" for c in value)
 
 def makedir_if_not_exists(dirname):
-    if not os.path.isdir(dirname):
-        os.makedirs(dirname)
+    os.makedirs(dirname, exist_ok=True)
@@ -14,6 +14,11 @@ class Variable(Expression):
     def build(self, builder):
         return self.name
 
+    def evaluate(self, values=None, wrap=True):
+        if values is None or self.name not in values:
+            return super().evaluate(values, wrap)
+        return values[self.name]
+
     def get_variables(self):
         return frozenset((self,))
 
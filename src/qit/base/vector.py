@@ -3,6 +3,8 @@ from qit.base.int import Int
 
 class Vector(Type):
 
+    headers = ("vector",)
+
     def __init__(self, element_type):
         super().__init__()
         self.element_type = element_type
@@ -21,9 +23,20 @@ class Vector(Type):
             return None
         return [ self.element_type.read(f) for i in range(size) ]
 
+    def write(self, f, value):
+        Int().write(f, len(value))
+        for v in value:
+            self.element_type.write(f, v)
+
     def childs_from_value(self, value):
         return value
 
+    def evaluate_value(self, value, values=None):
+        return [ v.evaluate(values) for v in value ]
+
+    def sort_key(self, value):
+        return [ self.element_type.sort_key(v) for v in value ]
+
     @property
     def write_function(self):
         f = self.prepare_write_function()
@@ -36,6 +49,20 @@ class Vector(Type):
              write_function=self.element_type.write_function)
         return f
 
+    @property
+    def read_function(self):
+        f = self.prepare_read_function()
+        f.code("""
+        qint size;
+        {{read_int}}(input, size);
+        value.resize(size);
+        for (auto & item : value) {
+            {{read_function}}(input, item);
+        }
+        """, read_int=Int().read_function,
+             read_function=self.element_type.read_function)
+        return f
+
     def build_value(self, builder, value):
         args = ",".join(v.build(builder) for v in value)
         return "{{ {} }}".format(args)
@@ -45,3 +72,6 @@ class Vector(Type):
 
     def transform_python_instance(self, obj):
         return tuple(self.element_type.value(v) for v in obj)
+
+    def __repr__(self):
+        return "Vector({})".format(repr(self.element_type))
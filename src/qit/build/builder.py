@@ -1,26 +1,164 @@
 
 from qit.build.writer import CppWriter
 from qit.base.utils import sorted_variables
-import jinja2
+
+import functools
+import hashlib
+
+# Compiled templates of inline code of functions, shared by all builders;
+# the same code is used by many functions (e.g. write functions of types)
+@functools.lru_cache(maxsize=1024)
+def get_template(code):
+    # jinja2 is imported on the first use, it is slow to import
+    import jinja2
+    return jinja2.Template(code)
+
+
+# Members of a functor that is being declared. Expressions that depend only
+# on variables of the functor (and not on its parameters) are invariant during
+# the life of the functor, hence they are stored in its members instead of
+# being recomputed in each call.
+class HoistingScope(object):
+
+    def __init__(self, variables):
+        self.variables = variables
+        self.members = {}
+        self.declarations = []
+
 
 class CppBuilder(object):
 
-    def __init__(self, env):
+    def __init__(self, env, execution=None):
         self.env = env
+        if execution is None:
+            execution = env.execution
+        self.execution = execution
         self.writer = CppWriter()
         self.id_counter = 100
-        self.declaration_keys = []
+        self.declaration_keys = set()
+        self.visited_objects = set()
         self.autonames = {}
         self.included_filenames = set()
+        self.external_functions = {}
+        self.headers = set()
+        # When the program is split into translation units, bodies of
+        # functors are written out of line into separate writers and
+        # the main function goes into its own writer
+        if env.translation_units > 1:
+            self.function_bodies = []
+        else:
+            self.function_bodies = None
+        self.declarations_writer = None
+        # Lines of declarations written by each object, so that a unit
+        # includes only declarations its functions depend on
+        self.declaration_spans = {}
+        self.scope = None
 
     def get_autoname(self, obj):
         name = self.autonames.get(obj)
         if name is not None:
             return name
-        name = self.new_id(obj.autoname_prefix)
+        if obj.is_type():
+            name = self.get_type_name(obj)
+        else:
+            name = self.new_id(obj.autoname_prefix)
         self.autonames[obj] = name
         return name
 
+    def get_type_name(self, type):
+        # Names of types are given by their declarations, so a type has the
+        # same name in all programs and separately compiled objects are
+        # shared by them
+        digest = hashlib.sha1(repr(type).encode()).hexdigest()[:12]
+        name = "{}_{}".format(type.autoname_prefix, digest)
+        names = set(self.autonames.values())
+        i = 1
+        while name in names:
+            i += 1
+            name = "{}_{}_{}".format(type.autoname_prefix, digest, i)
+        return name
+
+    def get_string(self):
+        if self.declarations_writer is None:
+            return self.writer.get_string()
+        parts = [self.declarations_writer.get_string()]
+        included_filenames = set()
+        for filename, writer, function in self.function_bodies:
+            if filename is not None and filename not in included_filenames:
+                included_filenames.add(filename)
+                parts.append("#include \"{}\"\n".format(filename))
+            parts.append(writer.get_string())
+        parts.append(self.writer.get_string())
+        return "".join(parts)
+
+    def get_translation_units(self):
+        # Returns pairs (declarations, code); the last unit is the main
+        # function. Bodies using the same external file have to be in the
+        # same unit, otherwise functions defined in the file would be defined
+        # twice
+        groups = []
+        group_by_filename = {}
+        for filename, writer, function in self.function_bodies:
+            group = group_by_filename.get(filename)
+            if group is None:
+                group = (filename, [])
+                groups.append(group)
+                if filename is not None:
+                    group_by_filename[filename] = group
+            group[1].append((writer, function))
+
+        # A unit of a group is given by its code, hence adding or removing
+        # other functions does not move bodies between units
+        count = self.env.translation_units
+        units = [[] for i in range(count)]
+        for group in groups:
+            text = "".join(w.get_string() for w, f in group[1])
+            digest = hashlib.sha1(text.encode()).hexdigest()
+            units[int(digest, 16) % count].append(group)
+
+        result = []
+        for unit in units:
+            if not unit:
+                continue
+            parts = []
+            functions = []
+            for filename, bodies in unit:
+                if filename is not None:
+                    parts.append("#include \"{}\"\n".format(filename))
+                parts.extend(w.get_string() for w, f in bodies)
+                functions.extend(f for w, f in bodies)
+            result.append((self.get_declarations(functions), "".join(parts)))
+        result.append((self.declarations_writer.get_string(),
+                       self.writer.get_string()))
+        return result
+
+    def get_declarations(self, objects):
+        # Declarations of objects and of everything they depend on, in the
+        # order in which they were written; lines written outside of
+        # declarations (e.g. includes) are always kept
+        spans = [span for writer, span in self.declaration_spans.values()
+                 if writer is self.declarations_writer]
+        used = set()
+        visited = set()
+        stack = list(objects)
+        while stack:
+            obj = stack.pop()
+            if obj in visited:
+                continue
+            visited.add(obj)
+            writer, span = self.declaration_spans.get(obj, (None, None))
+            if writer is self.declarations_writer:
+                used.update(range(*span))
+            stack.extend(obj.childs)
+            if obj.is_function() and obj.return_type is not None:
+                stack.append(obj.return_type)
+        declared = set()
+        for span in spans:
+            declared.update(range(*span))
+        lines = self.declarations_writer.lines
+        return "".join(line + "\n" for i, line in enumerate(lines)
+                       if i in used or i not in declared)
+
     def include_filename(self, filename):
         if filename in self.included_filenames:
             return
@@ -29,17 +167,116 @@ class CppBuilder(object):
 
     def build_collect(self, obj, args):
         write_function = obj.type.write_function
-        self.write_header()
+        self.write_header(obj, write_function)
         obj.declare_all(self)
         write_function.declare_all(self)
         self.main_begin()
-        self.init_fifo()
+        self.init_output()
         self.init_variables(args)
-        self.writer.line(
-             "{}(output, {});", write_function.build(self), obj.build(self))
+        self.write_result(obj, write_function)
+        self.main_end()
+
+    def build_prepared(self, obj, variables):
+        variables = sorted_variables(variables)
+        write_function = obj.type.write_function
+        read_functions = [v.type.read_function for v in variables]
+        self.write_header(obj, write_function, *read_functions)
+        obj.declare_all(self)
+        write_function.declare_all(self)
+        for read_function in read_functions:
+            read_function.declare_all(self)
+        self.main_begin()
+        # Variables are read before the output is opened,
+        # hence the caller can write all input before reading output
+        self.init_input()
+        self.read_variables(variables, read_functions)
+        self.writer.line("fclose(input);")
+        self.init_output()
+        self.write_result(obj, write_function)
+        self.main_end()
+
+    def build_sweep(self, obj, variables):
+        from qit.base.int import Int
+        variables = sorted_variables(variables)
+        write_function = obj.type.write_function
+        read_functions = [v.type.read_function for v in variables]
+        read_count = Int().read_function
+        write_size = Int().write_function
+        self.write_header(obj, write_function, read_count, write_size,
+                          *read_functions)
+        obj.declare_all(self)
+        for function in [write_function, read_count, write_size] + \
+                read_functions:
+            function.declare_all(self)
+        self.main_begin()
+        # Input is read before the output is opened (as in build_prepared),
+        # but it cannot be parsed at once, hence it is kept in memory
+        # Names of the loop are prefixed, as variables of the query are
+        # declared in the same scope
+        self.init_input(buffered=True)
+        self.init_output()
+        self.writer.line("char *qit_frame_data = NULL;")
+        self.writer.line("size_t qit_frame_size = 0;")
+        self.writer.line("FILE *qit_frame = "
+                         "open_memstream(&qit_frame_data, &qit_frame_size);")
+        self.writer.line("qint qit_count;")
+        self.writer.line("{}(input, qit_count);", read_count.build(self))
+        self.writer.line("for (qint qit_i = 0; qit_i < qit_count; qit_i++)")
+        self.writer.block_begin()
+        self.read_variables(variables, read_functions)
+        self.writer.line("rewind(qit_frame);")
+        self.writer.line("{}(qit_frame, {});",
+                         write_function.build(self), obj.build(self))
+        self.writer.line("fflush(qit_frame);")
+        self.writer.line("qint qit_size = ftell(qit_frame);")
+        self.writer.line("{}(output, qit_size);", write_size.build(self))
+        self.writer.line("fwrite(qit_frame_data, 1, qit_size, output);")
+        self.writer.block_end()
+        self.writer.line("fclose(qit_frame);")
+        self.writer.line("free(qit_frame_data);")
+        self.writer.line("fclose(input);")
+        self.writer.line("fclose(output);")
+        self.main_end()
+
+    def build_stream(self, iterator, args):
+        stream_function = iterator.stream_function
+        self.write_header(iterator, stream_function)
+        iterator.declare_all(self)
+        stream_function.declare_all(self)
+        self.main_begin()
+        self.init_output()
+        self.init_variables(args)
+        self.writer.line("{}(output);", stream_function.build(self))
+        self.writer.line("fclose(output);")
+        self.main_end()
+
+    def build_multi(self, objs, args):
+        from qit.base.int import Int
+        write_functions = [obj.type.write_function for obj in objs]
+        write_tag = Int().write_function
+        self.write_header(write_tag, *(objs + write_functions))
+        for obj, write_function in zip(objs, write_functions):
+            obj.declare_all(self)
+            write_function.declare_all(self)
+        write_tag.declare_all(self)
+        self.main_begin()
+        self.init_output()
+        self.init_variables(args)
+        # Each result is preceded by the index of its section
+        for i, (obj, write_function) in enumerate(zip(objs, write_functions)):
+            self.writer.line("{}(output, {});", write_tag.build(self), i)
+            self.write_value(obj, write_function)
         self.writer.line("fclose(output);")
         self.main_end()
 
+    def write_result(self, obj, write_function):
+        self.write_value(obj, write_function)
+        self.writer.line("fclose(output);")
+
+    def write_value(self, obj, write_function):
+        self.writer.line(
+             "{}(output, {});", write_function.build(self), obj.build(self))
+
     def write_expression_into_variable(self, expr):
         variable = self.new_id()
         self.writer.line("{} {} = {};",
@@ -48,6 +285,23 @@ class CppBuilder(object):
                          expr.build(self))
         return variable
 
+    def build_external_source(self, filename, functions):
+        # Translation unit of a separately compiled source; it depends only
+        # on types used in declarations of functions, so the same object file
+        # is reused by different queries
+        builder = CppBuilder(self.env, self.execution)
+        builder.autonames = self.autonames
+        types = []
+        for function in functions:
+            types.extend(p.type for p in function.params)
+            if function.return_type is not None:
+                types.append(function.return_type)
+        builder.write_header(*types)
+        for type in types:
+            type.declare_all(builder)
+        builder.include_filename(filename)
+        return builder
+
     def build_object(self, type, args):
         args = ",".join(a.build(self) for a in args)
         return "{}({})".format(type.build(self), args)
@@ -74,9 +328,25 @@ class CppBuilder(object):
         self.writer.line("assert({}.next({}));", iterator_variable, element)
         return element
 
-    def init_fifo(self):
-        self.writer.line("assert(argc > 1);")
-        self.writer.line("FILE *output = fopen(argv[1], \"w\");")
+    def init_output(self):
+        if self.execution == "library":
+            self.writer.line(
+                "FILE *output = open_memstream(output_data, output_size);")
+        else:
+            self.writer.line("assert(argc > 1);")
+            self.writer.line("FILE *output = fopen(argv[1], \"w\");")
+
+    def init_input(self, buffered=False):
+        if self.execution == "library":
+            self.writer.line("FILE *input = fmemopen("
+                             "(void*) input_data, input_size, \"r\");")
+        elif buffered:
+            self.writer.line("char *input_data = NULL;")
+            self.writer.line("size_t input_size = 0;")
+            self.writer.line("FILE *input = qit_buffer_input("
+                             "stdin, &input_data, &input_size);")
+        else:
+            self.writer.line("FILE *input = stdin;")
 
     def init_variables(self, args):
         for variable, value in sorted(args.items(), key=lambda v: v[0].name):
@@ -85,28 +355,50 @@ class CppBuilder(object):
                              variable.name,
                              value.build(self))
 
-    def write_header(self):
+    def read_variables(self, variables, read_functions):
+        for variable, read_function in zip(variables, read_functions):
+            self.writer.line("{} {};",
+                             variable.type.build(self),
+                             variable.name)
+            self.writer.line("{}(input, {});",
+                             read_function.build(self),
+                             variable.name)
+
+    def write_header(self, *objs):
+        for obj in objs:
+            self.headers.update(obj.get_headers())
         self.writer.line("/*")
         self.writer.line("       QIT generated file")
         self.writer.line("*/")
         self.writer.emptyline()
-        self.writer.line("#include <vector>")
-        self.writer.line("#include <set>")
-        self.writer.line("#include <map>")
-        self.writer.line("#include <iostream>")
-        self.writer.line("#include <assert.h>")
-        self.writer.line("#include <stdlib.h>")
-        self.writer.line("#include <time.h>")
-        self.writer.line("#include <algorithm>")
-        self.writer.line("#include <random>")
-        self.writer.emptyline()
-        self.writer.line("std::default_random_engine QIT_GENERATOR(time(nullptr));")
-        self.writer.line("typedef int32_t qint;")
+        self.writer.line("#include \"qit_runtime.hpp\"")
+        for header in sorted(self.headers):
+            self.writer.line("#include <{}>", header)
         self.writer.emptyline()
         self.writer.emptyline()
 
     def main_begin(self):
-        self.writer.line("int main(int argc, char **argv)")
+        if self.function_bodies is not None:
+            self.declarations_writer = self.writer
+            self.writer = CppWriter()
+        self.writer.line("thread_local std::default_random_engine "
+                         "QIT_GENERATOR(time(nullptr));")
+        self.writer.emptyline()
+        if self.execution == "library":
+            # Entry points of a program loaded as a shared library;
+            # output buffer is allocated by the library and released
+            # by qit_free
+            self.writer.line("extern \"C\" QIT_EXPORT "
+                             "void qit_free(char *buffer)")
+            self.writer.block_begin()
+            self.writer.line("free(buffer);")
+            self.writer.block_end()
+            self.writer.emptyline()
+            self.writer.line("extern \"C\" QIT_EXPORT int qit_run("
+                             "const char *input_data, size_t input_size, "
+                             "char **output_data, size_t *output_size)")
+        else:
+            self.writer.line("int main(int argc, char **argv)")
         self.writer.block_begin()
         self.writer.line("srand(time(NULL));")
 
@@ -120,10 +412,23 @@ class CppBuilder(object):
 
     ## Method for multiple dispatch of base classes
 
+    def declare_object(self, obj):
+        writer = self.writer
+        start = len(writer.lines)
+        obj.declare(self)
+        if self.function_bodies is not None:
+            self.declaration_spans[obj] = (writer, (start, len(writer.lines)))
+
+    def is_visited(self, obj):
+        if obj in self.visited_objects:
+            return True
+        self.visited_objects.add(obj)
+        return False
+
     def check_declaration_key(self, key):
         if key in self.declaration_keys:
             return True
-        self.declaration_keys.append(key)
+        self.declaration_keys.add(key)
         self.writer.line("/* Declaration: {} */", key)
         return False
 
@@ -179,6 +484,21 @@ class CppBuilder(object):
     # Function
 
     def build_function_call(self, function_call):
+        if self.is_invariant(function_call) and \
+                function_call.is_deterministic():
+            # Value is computed by the first call of the functor
+            scope = self.scope
+            self.scope = None
+            try:
+                expr = self.build_function_call(function_call)
+            finally:
+                self.scope = scope
+            type = function_call.type.build(self)
+            name = self.hoist(function_call, lambda name: (
+                "{} {};".format(type, name),
+                "bool {}_ready = false;".format(name)))
+            return "({0}_ready ? {0} : ({0}_ready = true, {0} = {1}))".format(
+                name, expr)
         functor = self.build_functor(function_call.function)
         args = ",".join(e.build(self) for e in function_call.args)
         return "{}({})".format(functor, args)
@@ -186,18 +506,54 @@ class CppBuilder(object):
     def build_functor(self, function):
         function_name = self.get_autoname(function)
         variables = sorted_variables(function.get_variables())
+        v = ",".join(v.build(self) for v in variables)
+        if self.is_invariant(function):
+            # Instance is created once with the enclosing functor
+            return self.hoist(function, lambda name: (
+                "{} {}{{{}}};".format(function_name, name, v),))
         if variables:
-            v = ",".join(v.build(self) for v in variables)
             return "({}({}))".format(function_name, v)
         else:
             return "{}()".format(function_name)
 
+    def is_invariant(self, obj):
+        return self.scope is not None and \
+            obj.get_variables() <= self.scope.variables
+
+    def hoist(self, obj, make_declarations):
+        name = self.scope.members.get(obj)
+        if name is None:
+            name = self.new_id("_m")
+            self.scope.members[obj] = name
+            self.scope.declarations.extend(make_declarations(name))
+        return name
+
+    def write_function_code(self, function):
+        self.scope = HoistingScope(function.get_variables())
+        try:
+            function.write_code(self)
+            return self.scope
+        finally:
+            self.scope = None
+
     def declare_function(self, function):
         if self.check_declaration_key(function):
             return
 
+        filename = None
         if function.is_external():
-            self.include_filename(self.env.get_function_filename(function))
+            filename = self.env.get_function_filename(function)
+            if self.env.separate_compilation:
+                self.external_functions.setdefault(filename, []).append(
+                    function)
+                self.writer.line("{};",
+                                 self.get_function_declaration(function))
+                filename = None
+            elif self.function_bodies is not None:
+                # File is included only into the unit with the body
+                self.included_filenames.add(filename)
+            else:
+                self.include_filename(filename)
 
         function_name = self.get_autoname(function)
         self.writer.class_begin(function_name)
@@ -214,20 +570,34 @@ class CppBuilder(object):
                              ",".join("{0}({0})".format(v.name)
                                       for v in variables))
 
-        params = [ p.type.build_param(self, p.name, p.const)
-                   for p in function.params ]
-        self.writer.line("{} operator()({})",
-                         function.return_type.build(self)
-                             if function.return_type else "void",
-                         ",".join(params))
-        self.writer.block_begin()
-        function.write_code(self)
-        self.writer.block_end()
+        params = ",".join(p.type.build_param(self, p.name, p.const)
+                          for p in function.params)
+        return_type = function.return_type.build(self) \
+                          if function.return_type else "void"
+        if self.function_bodies is None:
+            self.writer.line("{} operator()({})", return_type, params)
+            self.writer.block_begin()
+            scope = self.write_function_code(function)
+            self.writer.block_end()
+        else:
+            self.writer.line("{} operator()({});", return_type, params)
+            writer = self.writer
+            self.writer = CppWriter()
+            self.writer.line("{} {}::operator()({})",
+                             return_type, function_name, params)
+            self.writer.block_begin()
+            scope = self.write_function_code(function)
+            self.writer.block_end()
+            self.function_bodies.append((filename, self.writer, function))
+            self.writer = writer
 
         for variable in variables:
             self.writer.line("const {} &{};",
                              variable.type.build(self),
                              variable.name);
+        # Hoisted members are initialized after variables they may use
+        for line in scope.declarations:
+            self.writer.line("{}", line)
 
         self.writer.class_end()
 
@@ -241,9 +611,8 @@ class CppBuilder(object):
                 d[name] = obj
             else:
                 d[name] = obj.build(self)
-        template = jinja2.Template(inline_code)
-        template.globals.update(b=lambda obj: obj.build(self))
-        self.writer.text(template.render(d))
+        d["b"] = lambda obj: obj.build(self)
+        self.writer.text(get_template(inline_code).render(d))
 
     def write_function_external_call(self, function):
         call = ""
@@ -0,0 +1,60 @@
+from qit.base.utils import makedir_if_not_exists
+from qit.base.exception import QitException
+
+import json
+import os
+import shutil
+import tempfile
+
+INDEX_FILENAME = "index.json"
+BUNDLE_VERSION = 1
+
+
+# Directory with precompiled programs and an index that maps keys of
+# programs (see BuildCache.make_key) to files. Filenames in the index are
+# relative, hence the directory can be moved to another machine that
+# supports the target of programs ('march').
+class Bundle(object):
+
+    def __init__(self, directory):
+        self.directory = os.path.abspath(directory)
+        self.programs = {}
+        self.march = None
+        filename = os.path.join(self.directory, INDEX_FILENAME)
+        if os.path.isfile(filename):
+            with open(filename) as f:
+                index = json.load(f)
+            if index.get("version") != BUNDLE_VERSION:
+                raise QitException(
+                    "Bundle '{}' has unsupported version {}".format(
+                        self.directory, index.get("version")))
+            self.programs = index["programs"]
+            # Bundles without a target were built for the building machine
+            self.march = index.get("march", "native")
+
+    def get(self, key):
+        program = self.programs.get(key)
+        if program is None:
+            return None
+        filename = os.path.join(self.directory, program["filename"])
+        if not os.path.isfile(filename):
+            return None
+        return filename
+
+    def add(self, key, filename, execution):
+        makedir_if_not_exists(self.directory)
+        fd, tmp_filename = tempfile.mkstemp(prefix="tmp-", dir=self.directory)
+        os.close(fd)
+        shutil.copy(filename, tmp_filename)
+        os.replace(tmp_filename, os.path.join(self.directory, key))
+        self.programs[key] = { "filename": key, "execution": execution }
+
+    def save(self):
+        makedir_if_not_exists(self.directory)
+        fd, tmp_filename = tempfile.mkstemp(prefix="tmp-", dir=self.directory)
+        with os.fdopen(fd, "w") as f:
+            json.dump({ "version": BUNDLE_VERSION,
+                        "march": self.march,
+                        "programs": self.programs },
+                      f, indent=1, sort_keys=True)
+        os.replace(tmp_filename, os.path.join(self.directory, INDEX_FILENAME))
@@ -0,0 +1,138 @@
+
+from qit.base.utils import makedir_if_not_exists
+
+import collections
+import hashlib
+import os
+import shutil
+import tempfile
+import threading
+import logging
+
+LOG = logging.getLogger("qit")
+
+
+# On-disk cache of compiled programs. Entries are addressed by a hash of
+# everything that influences the result of a compilation. When the total size
+# of entries exceeds 'size_limit' (in bytes), the least recently used entries
+# are removed. An entry may also be a directory, its size is then the total
+# size of its files. Pinned entries (e.g. objects of a program that is
+# being linked) are not evicted until they are unpinned.
+class BuildCache(object):
+
+    def __init__(self, directory, size_limit):
+        self.directory = directory
+        self.size_limit = size_limit
+        self.lock = threading.Lock()
+        self.pinned = collections.Counter()
+
+    def make_key(self, text, compiler, flags, filenames=()):
+        h = hashlib.sha1()
+        for part in (text, compiler) + tuple(flags):
+            self._update(h, part.encode())
+        # Only names of files are used, so keys do not depend on the
+        # directory where qit is installed and programs can be relocated
+        for filename in sorted(filenames):
+            self._update(h, os.path.basename(filename).encode())
+            with open(filename, "rb") as f:
+                self._update(h, f.read())
+        return h.hexdigest()
+
+    def _update(self, h, data):
+        h.update(str(len(data)).encode())
+        h.update(b":")
+        h.update(data)
+
+    def get_filename(self, key):
+        return os.path.join(self.directory, key)
+
+    def get(self, key, pin=False):
+        filename = self.get_filename(key)
+        with self.lock:
+            if not os.path.isfile(filename):
+                return None
+            # mtime of entry is used as the time of the last use
+            os.utime(filename)
+            if pin:
+                self.pinned[filename] += 1
+        return filename
+
+    def unpin(self, filenames):
+        with self.lock:
+            for filename in filenames:
+                self.pinned[filename] -= 1
+                if not self.pinned[filename]:
+                    del self.pinned[filename]
+
+    def new_filename(self):
+        makedir_if_not_exists(self.directory)
+        fd, filename = tempfile.mkstemp(prefix="tmp-", dir=self.directory)
+        os.close(fd)
+        return filename
+
+    def put(self, key, filename):
+        makedir_if_not_exists(self.directory)
+        target = self.get_filename(key)
+        os.replace(filename, target)
+        self.evict(keep=target)
+        return target
+
+    def entries(self):
+        if not os.path.isdir(self.directory):
+            return []
+        result = []
+        for name in os.listdir(self.directory):
+            if name.startswith("tmp-"):
+                continue
+            path = os.path.join(self.directory, name)
+            try:
+                stat = os.stat(path)
+                size = stat.st_size
+                if os.path.isdir(path):
+                    size = self._directory_size(path)
+            except FileNotFoundError:
+                continue
+            result.append((stat.st_mtime, size, path))
+        return result
+
+    def _directory_size(self, directory):
+        size = 0
+        for root, dirs, files in os.walk(directory):
+            for name in files:
+                try:
+                    size += os.path.getsize(os.path.join(root, name))
+                except FileNotFoundError:
+                    pass
+        return size
+
+    def _remove(self, path):
+        if os.path.isdir(path):
+            shutil.rmtree(path, ignore_errors=True)
+            return
+        try:
+            os.unlink(path)
+        except FileNotFoundError:
+            pass
+
+    def size(self):
+        return sum(size for mtime, size, path in self.entries())
+
+    def evict(self, keep=None):
+        if self.size_limit is None:
+            return
+        with self.lock:
+            entries = self.entries()
+            total = sum(size for mtime, size, path in entries)
+            entries.sort()
+            for mtime, size, path in entries:
+                if total <= self.size_limit:
+                    break
+                if path == keep or path in self.pinned:
+                    continue
+                LOG.debug("Evicting %s from cache", path)
+                self._remove(path)
+                total -= size
+
+    def clear(self):
+        for mtime, size, path in self.entries():
+            self._remove(path)
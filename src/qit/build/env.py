@@ -1,16 +1,42 @@
 
 from qit.build.builder import CppBuilder
-from qit.base.utils import makedir_if_not_exists
-from qit.base.exception import MissingFiles
+from qit.base.utils import makedir_if_not_exists, bind_arguments
+from qit.base.utils import validate_variables, write_arguments
+from qit.base.int import Int
+from qit.base.exception import QitException, MissingFiles
+from qit.base.exception import CompilationFailed, BatchFailed
+from qit.build.cache import BuildCache
+from qit.build.prepared import PreparedQuery
+from qit.build.tiers import TierManager
+from qit.build.sections import Sections
+from qit.build.bundle import Bundle
+from qit.build.stream import Frames, read_frames, read_frames_async
+from qit.base.paths import RUNTIME_DIR, RUNTIME_HEADER
 
+from concurrent.futures import ThreadPoolExecutor, Future, as_completed
+import contextlib
+import threading
 import tempfile
 import os
+import io
+import time
 import subprocess
+import struct
 import logging
 
 
 LOG = logging.getLogger("qit")
 
+# Errors of one item of a batch, they do not stop other items; a broken
+# output or a missing file is reported as a failure of the item
+ITEM_ERRORS = (QitException,
+               subprocess.CalledProcessError,
+               struct.error,
+               OSError)
+
+# Standard headers precompiled together with the runtime header
+PRELUDE_HEADERS = ("algorithm", "map", "set", "utility", "vector")
+
 
 class CppEnv(object):
 
@@ -18,9 +44,79 @@ class CppEnv(object):
         self.qit = qit
         self.build_dir = os.path.abspath(qit.build_dir)
         self.compiler = "/usr/bin/g++"
-        self.cpp_flags = ("-O3",
-                          "-std=c++11",
-                          "-march=native")
+        self.cpp_flags = ("-std=c++11",)
+        self.quick_optimization_flags = ("-O1",)
+        self.cache = BuildCache(os.path.join(self.build_dir, "cache"),
+                                qit.cache_size)
+        # Precompiled headers, profiles and headers of translation units are
+        # kept in separate caches with the same limit, so large precompiled
+        # headers and profiles do not push programs out
+        self.pch_cache = BuildCache(os.path.join(self.build_dir, "pch"),
+                                    qit.cache_size)
+        self.pgo_cache = BuildCache(os.path.join(self.build_dir, "pgo"),
+                                    qit.cache_size)
+        self.units_cache = BuildCache(os.path.join(self.build_dir, "units"),
+                                      qit.cache_size)
+        self.precompiled_header = qit.precompiled_header
+        self.separate_compilation = qit.separate_compilation
+        self.translation_units = qit.translation_units
+        if qit.execution not in ("process", "library"):
+            raise QitException(
+                "Invalid execution mode '{}'".format(qit.execution))
+        self.execution = qit.execution
+        self.libraries = {}
+        self.lock = threading.Lock()
+        # Futures of builds in progress; a thread that asks for an artifact
+        # that is already being built waits for the running build
+        self.builds = {}
+        self.compile_slots = self.make_slots(qit.max_compiles)
+        self.run_slots = self.make_slots(qit.max_runs)
+        if qit.bundle is not None:
+            self.bundle = Bundle(qit.bundle)
+        else:
+            self.bundle = None
+        # Programs of a bundle are found only under keys of the flags they
+        # were built with, hence the target of the bundle is used by default
+        self.march = qit.march
+        if self.march is None:
+            self.march = self.bundle.march if self.bundle else "native"
+        elif self.bundle is not None and self.bundle.march != self.march:
+            raise QitException(
+                "Bundle '{}' is built for -march={}, not -march={}".format(
+                    self.bundle.directory, self.bundle.march, self.march))
+        self.optimization_flags = ("-O3", "-march=" + self.march)
+        if qit.tiered:
+            self.tiers = TierManager(self, qit.tier_runs, qit.tier_threshold)
+        else:
+            self.tiers = None
+
+    def make_slots(self, limit):
+        if limit is None:
+            return contextlib.nullcontext()
+        return threading.BoundedSemaphore(limit)
+
+    def single_flight(self, key, fn, *args):
+        with self.lock:
+            future = self.builds.get(key)
+            if future is not None:
+                owner = False
+            else:
+                owner = True
+                future = Future()
+                self.builds[key] = future
+        if not owner:
+            LOG.debug("Waiting for build of %s", key)
+            return future.result()
+        try:
+            result = fn(*args)
+            future.set_result(result)
+            return result
+        except BaseException as e:
+            future.set_exception(e)
+            raise
+        finally:
+            with self.lock:
+                del self.builds[key]
 
     def run_collect(self, obj, args):
         self.check_all(obj)
@@ -28,53 +124,697 @@ class CppEnv(object):
         builder.build_collect(obj, args)
         return self.compile_builder(builder, obj.type)
 
+    async def run_async(self, obj, args):
+        import asyncio
+        loop = asyncio.get_running_loop()
+        self.check_all(obj)
+        builder = CppBuilder(self)
+        builder.build_collect(obj, args)
+        # Compilation is shared with other callers of the same program
+        # (see single_flight), so it is not interrupted by cancellation
+        exe_filename = await loop.run_in_executor(
+            None, self.build_program, builder)
+        return await self.execute_async(exe_filename, obj.type)
+
+    def iterate(self, iterator, args):
+        self.check_all(iterator)
+        # Output of a library is available only when its run ends,
+        # hence streams are always read from a running process
+        builder = CppBuilder(self, "process")
+        builder.build_stream(iterator, args)
+        exe_filename = self.build_program(builder)
+        return self.stream_program(exe_filename, iterator.element_type)
+
+    async def iterate_async(self, iterator, args):
+        import asyncio
+        loop = asyncio.get_running_loop()
+        self.check_all(iterator)
+        builder = CppBuilder(self, "process")
+        builder.build_stream(iterator, args)
+        exe_filename = await loop.run_in_executor(
+            None, self.build_program, builder)
+        type = iterator.element_type
+        async with self.run_slot_async():
+            process, reader, transport = \
+                await self.start_program_async(exe_filename)
+            try:
+                async for item in read_frames_async(reader, type):
+                    yield item
+                await process.wait()
+            finally:
+                await self.stop_program_async(process, transport)
+
+    def sweep(self, obj, bindings):
+        self.check_all(obj)
+        variables = obj.get_variables()
+        builder = CppBuilder(self)
+        builder.build_sweep(obj, variables)
+        f = io.BytesIO()
+        Int().write(f, len(bindings))
+        for args in bindings:
+            write_arguments(f, variables, args)
+        exe_filename = self.build_program(builder)
+        return self.execute(exe_filename, Frames(obj.type), f.getvalue())
+
+    def run_multi(self, objs, args):
+        names = list(objs)
+        objs = [objs[name] for name in names]
+        for obj in objs:
+            self.check_all(obj)
+        builder = CppBuilder(self)
+        builder.build_multi(objs, args)
+        results = self.compile_builder(
+            builder, Sections([obj.type for obj in objs]))
+        return dict(zip(names, results))
+
+    def prepare(self, obj, pgo=False, training_args=None):
+        self.check_all(obj)
+        if pgo:
+            # Profile is collected by running the program as a process
+            builder = CppBuilder(self, "process")
+        else:
+            builder = CppBuilder(self)
+        builder.build_prepared(obj, obj.get_variables())
+        return PreparedQuery(self, obj, builder, pgo, training_args)
+
+    def run_many(self, items, jobs=None):
+        programs = []
+        errors = {}
+        for i, (obj, args) in enumerate(items):
+            try:
+                obj, args = bind_arguments(obj, args)
+                self.check_all(obj)
+                builder = CppBuilder(self)
+                builder.build_collect(obj, args)
+                key = self.get_program_key(builder)
+                programs.append((i, builder, obj.type, key))
+            except ITEM_ERRORS as e:
+                errors[i] = e
+
+        # Identical programs are compiled only once
+        keys = {}
+        for i, builder, type, key in programs:
+            keys.setdefault(key, []).append((i, builder, type))
+
+        results = [None] * len(items)
+        with ThreadPoolExecutor(jobs) as compile_pool, \
+             ThreadPoolExecutor(jobs) as run_pool:
+            compilations = {}
+            for key, group in keys.items():
+                future = compile_pool.submit(
+                    self.build_program, group[0][1], key)
+                compilations[future] = group
+
+            runs = {}
+            for future in as_completed(compilations):
+                group = compilations[future]
+                try:
+                    exe_filename = future.result()
+                except ITEM_ERRORS as e:
+                    for i, builder, type in group:
+                        errors[i] = e
+                    continue
+                for i, builder, type in group:
+                    runs[run_pool.submit(
+                        self.execute, exe_filename, type)] = i
+
+            for future, i in runs.items():
+                try:
+                    results[i] = future.result()
+                except ITEM_ERRORS as e:
+                    errors[i] = e
+
+        if errors:
+            raise BatchFailed(results, errors)
+        return results
+
+    def build_bundle(self, queries, directory, jobs=None):
+        bundle = Bundle(directory)
+        if bundle.programs and bundle.march != self.march:
+            raise QitException(
+                "Bundle '{}' is built for -march={}, not -march={}".format(
+                    bundle.directory, bundle.march, self.march))
+        bundle.march = self.march
+        programs = {}
+        for obj, args in queries:
+            obj = obj.get_expression()
+            builder = CppBuilder(self)
+            if args is None and obj.get_variables():
+                # Query with unbound variables is built as a prepared query
+                validate_variables(obj.get_variables())
+                self.check_all(obj)
+                builder.build_prepared(obj, obj.get_variables())
+            else:
+                obj, args = bind_arguments(obj, args)
+                self.check_all(obj)
+                builder.build_collect(obj, args)
+            programs.setdefault(self.get_program_key(builder), builder)
+
+        with ThreadPoolExecutor(jobs) as pool:
+            compilations = dict(
+                (pool.submit(self.compile_program, builder, key), key)
+                for key, builder in programs.items())
+            for future in as_completed(compilations):
+                bundle.add(compilations[future],
+                           future.result(),
+                           self.execution)
+        bundle.save()
+        return bundle
+
+    def get_cached_program(self, key):
+        if self.bundle is not None:
+            filename = self.bundle.get(key)
+            if filename is not None:
+                return filename
+        return self.cache.get(key)
+
     def get_file(self):
         makedir_if_not_exists(self.build_dir)
-        if self.qit.debug:
-            filename = os.path.join(self.build_dir, "debug.cpp")
-            return open(filename, "w")
-        else:
-            return tempfile.NamedTemporaryFile(
-                      mode="w",
-                      prefix="qit-",
-                      suffix=".cpp",
-                      dir=self.build_dir,
-                      delete=False)
+        return tempfile.NamedTemporaryFile(
+                  mode="w",
+                  prefix="qit-",
+                  suffix=".cpp",
+                  dir=self.build_dir,
+                  delete=False)
+
+    def write_debug_file(self, text):
+        with self.get_file() as f:
+            f.write(text)
+        os.replace(f.name, os.path.join(self.build_dir, "debug.cpp"))
 
     def compile_builder(self, builder, type):
-        text = builder.writer.get_string()
-        makedir_if_not_exists(self.build_dir)
+        exe_filename = self.build_program(builder)
+        return self.execute(exe_filename, type)
+
+    def get_cpp_flags(self, execution, optimization_flags=None):
+        if optimization_flags is None:
+            optimization_flags = self.optimization_flags
+        flags = self.cpp_flags + optimization_flags
+        if execution == "library":
+            # All programs use the same names of classes; symbols of a library
+            # (e.g. static locals of functors) would be bound to those of
+            # the first loaded library, hence only entry points are exported
+            flags += ("-fPIC", "-fvisibility=hidden", "-fno-gnu-unique")
+        return flags
+
+    def get_link_flags(self, execution):
+        if execution == "library":
+            return ("-shared",)
+        return ()
+
+    def get_program_key(self, builder, optimization_flags=None, extra_flags=()):
+        execution = builder.execution
+        cpp_flags = self.get_cpp_flags(execution, optimization_flags)
+        key = self.cache.make_key(builder.get_string(),
+                                  self.compiler,
+                                  cpp_flags +
+                                      self.get_link_flags(execution) +
+                                      extra_flags,
+                                  builder.included_filenames |
+                                      set((RUNTIME_HEADER,)))
+        if not builder.external_functions:
+            return key
+        # Separately compiled sources change only keys of their objects,
+        # the program is then relinked without recompiling its own code
+        keys = [key]
+        for text, filenames in self.get_external_sources(builder):
+            keys.append(self.get_object_key(text, filenames, cpp_flags))
+        return self.cache.make_key("\n".join(keys), self.compiler, ())
+
+    def build_program(self, builder, key=None):
+        if key is None:
+            key = self.get_program_key(builder)
+        if self.tiers is not None:
+            return self.tiers.get_program(builder, key)
+        return self.compile_program(builder, key)
+
+    def compile_program(self, builder, key, optimization_flags=None):
+        text = builder.get_string()
+        if self.qit.debug:
+            self.write_debug_file(text)
+
+        exe_filename = self.get_cached_program(key)
+        if exe_filename is not None:
+            LOG.debug("Using cached program %s", exe_filename)
+            return exe_filename
+        return self.single_flight(key,
+                                  self.create_program,
+                                  builder,
+                                  key,
+                                  optimization_flags)
+
+    def create_program(self, builder, key, optimization_flags=None):
+        # Program may be finished by other thread in the meantime
+        exe_filename = self.get_cached_program(key)
+        if exe_filename is not None:
+            return exe_filename
+        exe_filename = self.cache.new_filename()
+        try:
+            if builder.declarations_writer is not None:
+                self.compile_units(builder, exe_filename, optimization_flags)
+            else:
+                self.compile_source(builder,
+                                    builder.get_string(),
+                                    exe_filename,
+                                    optimization_flags)
+            return self.cache.put(key, exe_filename)
+        finally:
+            if os.path.exists(exe_filename):
+                # Compilation failed, remove incomplete output
+                os.unlink(exe_filename)
+
+    def compile_source(self,
+                       builder,
+                       text,
+                       exe_filename,
+                       optimization_flags=None):
+        if builder.external_functions:
+            self.link_program(builder, exe_filename, optimization_flags)
+            return
         with self.get_file() as f:
             filename = f.name
-            logging.debug("Creating file %s", filename)
+            LOG.debug("Creating file %s", filename)
             f.write(text)
-        exe_filename = filename[:-4]
-        args = (self.compiler, "-o", exe_filename, filename) + self.cpp_flags
-        subprocess.check_call(args)
+        pins = []
+        try:
+            args = self.get_compile_args(builder,
+                                         exe_filename,
+                                         filename,
+                                         pins,
+                                         optimization_flags)
+            self.compile(args, filename)
+        finally:
+            self.cache.unpin(pins)
+            os.unlink(filename)
+
+    def link_program(self, builder, exe_filename, optimization_flags=None):
+        cpp_flags = self.get_cpp_flags(builder.execution, optimization_flags)
+        filenames = builder.included_filenames | set((RUNTIME_HEADER,))
+        pins = []
+        try:
+            objects = (self.build_object(builder.get_string(),
+                                         filenames,
+                                         cpp_flags,
+                                         pins),)
+            args = (self.compiler, "-o", exe_filename) + \
+                    objects + \
+                    self.build_external_objects(builder, cpp_flags, pins) + \
+                    cpp_flags + \
+                    self.get_link_flags(builder.execution)
+            self.compile(args, exe_filename)
+        finally:
+            self.cache.unpin(pins)
+
+    def compile_units(self, builder, exe_filename, optimization_flags=None):
+        cpp_flags = self.get_cpp_flags(builder.execution, optimization_flags)
+        units = []
+        for declarations, code in builder.get_translation_units():
+            header_filename = self.write_units_header(declarations)
+            units.append("#include \"{}\"\n".format(header_filename) + code)
+        filenames = builder.included_filenames | set((RUNTIME_HEADER,))
+        # Objects are cached by their source, hence only units whose code
+        # has changed are recompiled
+        jobs = min(len(units), os.cpu_count() or 1)
+        pins = []
+        try:
+            with ThreadPoolExecutor(jobs) as pool:
+                objects = tuple(pool.map(
+                    lambda text: self.build_object(text,
+                                                   filenames,
+                                                   cpp_flags,
+                                                   pins),
+                    units))
+            args = (self.compiler, "-o", exe_filename) + \
+                    objects + \
+                    self.build_external_objects(builder, cpp_flags, pins) + \
+                    cpp_flags + \
+                    self.get_link_flags(builder.execution)
+            self.compile(args, header_filename)
+        finally:
+            self.cache.unpin(pins)
+        self.units_cache.evict()
+
+    def write_units_header(self, text):
+        # Header with declarations used by a unit; its name is given by
+        # its content, so it also becomes a part of keys of objects
+        key = self.units_cache.make_key(text, self.compiler, ())
+        filename = self.units_cache.get_filename(key + ".hpp")
+        if os.path.isfile(filename):
+            os.utime(filename)
+            return filename
+        makedir_if_not_exists(self.units_cache.directory)
+        fd, tmp_filename = tempfile.mkstemp(prefix="tmp-",
+                                            dir=self.units_cache.directory)
+        with os.fdopen(fd, "w") as f:
+            f.write(text)
+        os.replace(tmp_filename, filename)
+        return filename
+
+    def get_compile_args(self,
+                         builder,
+                         exe_filename,
+                         filename,
+                         pins,
+                         optimization_flags=None):
+        cpp_flags = self.get_cpp_flags(builder.execution, optimization_flags)
+        return (self.compiler, "-o", exe_filename, filename) + \
+                self.build_external_objects(builder, cpp_flags, pins) + \
+                cpp_flags + \
+                self.get_link_flags(builder.execution) + \
+                self.get_include_args(cpp_flags)
+
+    def build_pgo_program(self, builder, type, training_input):
+        key = self.get_program_key(builder, extra_flags=("-fprofile-use",))
+        exe_filename = self.get_cached_program(key)
+        if exe_filename is not None:
+            LOG.debug("Using cached program %s", exe_filename)
+            return exe_filename
+        return self.single_flight(key,
+                                  self.create_pgo_program,
+                                  builder,
+                                  type,
+                                  training_input,
+                                  key)
+
+    def create_pgo_program(self, builder, type, training_input, key):
+        exe_filename = self.get_cached_program(key)
+        if exe_filename is not None:
+            return exe_filename
+
+        # Profile data are kept in a directory given by the hash of source,
+        # hence a program evicted from the cache is rebuilt without training
+        pgo_dir = self.pgo_cache.get_filename(self.get_program_key(builder))
+        makedir_if_not_exists(pgo_dir)
+        os.utime(pgo_dir)
+        filename = os.path.join(pgo_dir, "program.cpp")
+        exe_filename = os.path.join(pgo_dir, "program")
+        with open(filename, "w") as f:
+            f.write(builder.get_string())
+
+        pins = []
+        try:
+            args = self.get_compile_args(builder, exe_filename, filename, pins)
+            if not os.path.isfile(exe_filename + ".gcda"):
+                LOG.info("Collecting profile in %s", pgo_dir)
+                self.compile(args + ("-fprofile-generate",), filename)
+                self.run_program(exe_filename, type, training_input)
+            self.compile(args + ("-fprofile-use",), filename)
+        finally:
+            self.cache.unpin(pins)
+        self.pgo_cache.evict(keep=pgo_dir)
+        return self.cache.put(key, exe_filename)
+
+    def get_external_sources(self, builder):
+        for filename, functions in sorted(builder.external_functions.items()):
+            source_builder = builder.build_external_source(filename, functions)
+            yield (source_builder.get_string(),
+                   source_builder.included_filenames | set((RUNTIME_HEADER,)))
+
+    def build_external_objects(self, builder, cpp_flags, pins):
+        return tuple(self.build_object(text, filenames, cpp_flags, pins)
+                     for text, filenames in self.get_external_sources(builder))
+
+    def get_object_key(self, text, filenames, cpp_flags):
+        return self.cache.make_key(text,
+                                   self.compiler,
+                                   cpp_flags + ("-c",),
+                                   filenames)
+
+    def build_object(self, text, filenames, cpp_flags, pins):
+        # Object is pinned in the cache (and its filename is appended to
+        # 'pins') until the program that links it is created
+        key = self.get_object_key(text, filenames, cpp_flags)
+        while True:
+            object_filename = self.cache.get(key, pin=True)
+            if object_filename is not None:
+                LOG.debug("Using cached object %s", object_filename)
+                pins.append(object_filename)
+                return object_filename
+            # Object may be evicted before it is pinned, it is then rebuilt
+            self.single_flight(key, self.create_object, key, text, cpp_flags)
+
+    def create_object(self, key, text, cpp_flags):
+        object_filename = self.cache.get(key)
+        if object_filename is not None:
+            return object_filename
+        with self.get_file() as f:
+            filename = f.name
+            f.write(text)
+        object_filename = self.cache.new_filename()
+        try:
+            args = (self.compiler, "-c", "-o", object_filename, filename) + \
+                    cpp_flags + \
+                    self.get_include_args(cpp_flags)
+            self.compile(args, filename)
+            return self.cache.put(key, object_filename)
+        finally:
+            os.unlink(filename)
+            if os.path.exists(object_filename):
+                os.unlink(object_filename)
+
+    def compile(self, args, filename):
+        LOG.debug("Compiling: %s", args)
+        with self.compile_slots:
+            process = subprocess.run(args,
+                                     stdout=subprocess.PIPE,
+                                     stderr=subprocess.STDOUT,
+                                     universal_newlines=True)
+        if process.returncode != 0:
+            raise CompilationFailed(filename, process.stdout)
+        if process.stdout:
+            LOG.debug("Compiler output:\n%s", process.stdout)
+
+    def get_include_args(self, cpp_flags):
+        args = ("-I", RUNTIME_DIR)
+        if self.precompiled_header:
+            filename = self.get_precompiled_header(cpp_flags)
+            if filename is not None:
+                args += ("-include", filename)
+        return args
+
+    def get_precompiled_header(self, cpp_flags):
+        # One header for each compiler and flags, whatever headers a program
+        # uses; headers outside the prelude are included by the source itself
+        text = "#include \"qit_runtime.hpp\"\n"
+        text += "".join("#include <{}>\n".format(h) for h in PRELUDE_HEADERS)
+        key = self.pch_cache.make_key(text,
+                                      self.compiler,
+                                      cpp_flags,
+                                      (RUNTIME_HEADER,))
+        pch_dir = self.pch_cache.get_filename(key)
+        filename = os.path.join(pch_dir, "qit_prelude.hpp")
+        if os.path.isfile(filename + ".gch"):
+            os.utime(pch_dir)
+            return filename
+        return self.single_flight(key,
+                                  self.create_precompiled_header,
+                                  pch_dir,
+                                  filename,
+                                  text,
+                                  cpp_flags)
+
+    def create_precompiled_header(self, pch_dir, filename, text, cpp_flags):
+        if os.path.isfile(filename + ".gch"):
+            return filename
+        makedir_if_not_exists(pch_dir)
+        fd, tmp_filename = tempfile.mkstemp(prefix="qit_prelude.hpp.tmp-",
+                                            dir=pch_dir)
+        with os.fdopen(fd, "w") as f:
+            f.write(text)
+        os.replace(tmp_filename, filename)
+
+        fd, tmp_filename = tempfile.mkstemp(prefix="qit_prelude.hpp.gch.tmp-",
+                                            dir=pch_dir)
+        os.close(fd)
+        args = (self.compiler, "-x", "c++-header", "-o", tmp_filename,
+                filename, "-I", RUNTIME_DIR) + cpp_flags
+        LOG.debug("Creating precompiled header %s", filename)
+        try:
+            self.compile(args, filename)
+        except CompilationFailed as e:
+            os.unlink(tmp_filename)
+            LOG.warning("Precompiled header cannot be created: %s", e)
+            return None
+        os.replace(tmp_filename, filename + ".gch")
+        self.pch_cache.evict(keep=pch_dir)
+        return filename
+
+    def execute(self, filename, type, input=None, execution=None):
+        if execution is None:
+            execution = self.execution
+        with self.run_slots:
+            start = time.time()
+            if execution == "library":
+                result = self.run_library(filename, type, input)
+            else:
+                result = self.run_program(filename, type, input)
+            run_time = time.time() - start
+        if self.tiers is not None:
+            self.tiers.record_run(filename, run_time)
+        return result
+
+    def load_library(self, filename):
+        with self.lock:
+            return self.load_library_locked(filename)
+
+    def load_library_locked(self, filename):
+        import ctypes
+        library = self.libraries.get(filename)
+        if library is None:
+            LOG.debug("Loading library %s", filename)
+            library = ctypes.CDLL(filename)
+            library.qit_run.argtypes = (
+                ctypes.c_char_p,
+                ctypes.c_size_t,
+                ctypes.POINTER(ctypes.POINTER(ctypes.c_char)),
+                ctypes.POINTER(ctypes.c_size_t))
+            library.qit_run.restype = ctypes.c_int
+            library.qit_free.argtypes = (ctypes.POINTER(ctypes.c_char),)
+            library.qit_free.restype = None
+            self.libraries[filename] = library
+        return library
+
+    def run_library(self, filename, type, input=None):
+        import ctypes
+        library = self.load_library(filename)
+        if input is None:
+            input = b""
+        output = ctypes.POINTER(ctypes.c_char)()
+        output_size = ctypes.c_size_t()
+        LOG.debug("Running: %s", filename)
+        library.qit_run(input,
+                        len(input),
+                        ctypes.byref(output),
+                        ctypes.byref(output_size))
+        try:
+            data = ctypes.string_at(output, output_size.value)
+        finally:
+            library.qit_free(output)
         if type:
-            fifo_name = exe_filename + "-fifo"
-        else:
-            fifo_name = None
-        return self.run_program(exe_filename, fifo_name, type)
+            return type.read(io.BytesIO(data))
 
-    def run_program(self, exe_filename, fifo_name, type):
-        if fifo_name:
+    def run_program(self, exe_filename, type, input=None):
+        if type:
+            fifo_dir = tempfile.mkdtemp(prefix="qit-", dir=self.build_dir)
+            fifo_name = os.path.join(fifo_dir, "fifo")
             os.mkfifo(fifo_name)
             try:
                 args = (exe_filename, fifo_name,)
-                logging.debug("Running: %s", args)
-                popen = subprocess.Popen(args)
+                LOG.debug("Running: %s", args)
+                if input is None:
+                    popen = subprocess.Popen(args)
+                else:
+                    popen = subprocess.Popen(args, stdin=subprocess.PIPE)
+                    with popen.stdin:
+                        popen.stdin.write(input)
                 with open(fifo_name, "rb") as f:
                     result = type.read(f)
                 popen.wait()
                 return result
             finally:
                 os.unlink(fifo_name)
+                os.rmdir(fifo_dir)
         else:
             args = (exe_filename,)
-            logging.debug("Running: %s", args)
+            LOG.debug("Running: %s", args)
             subprocess.check_call(args)
 
+    def stream_program(self, exe_filename, type):
+        # Slot is held until the stream is read or closed
+        with self.run_slots:
+            fifo_dir = tempfile.mkdtemp(prefix="qit-", dir=self.build_dir)
+            fifo_name = os.path.join(fifo_dir, "fifo")
+            os.mkfifo(fifo_name)
+            popen = None
+            try:
+                args = (exe_filename, fifo_name)
+                LOG.debug("Running: %s", args)
+                popen = subprocess.Popen(args)
+                with open(fifo_name, "rb") as f:
+                    yield from read_frames(f, type)
+                popen.wait()
+            finally:
+                # Reading may be stopped before the end of stream
+                if popen is not None and popen.poll() is None:
+                    popen.kill()
+                    popen.wait()
+                os.unlink(fifo_name)
+                os.rmdir(fifo_dir)
+
+    async def execute_async(self, filename, type, input=None):
+        import asyncio
+        if self.execution == "library":
+            loop = asyncio.get_running_loop()
+            return await loop.run_in_executor(
+                None, self.execute, filename, type, input)
+        async with self.run_slot_async():
+            start = time.time()
+            process, reader, transport = \
+                await self.start_program_async(filename, input)
+            try:
+                data = await reader.read()
+                await process.wait()
+            finally:
+                await self.stop_program_async(process, transport)
+            run_time = time.time() - start
+        if self.tiers is not None:
+            self.tiers.record_run(filename, run_time)
+        return type.read(io.BytesIO(data))
+
+    @contextlib.asynccontextmanager
+    async def run_slot_async(self):
+        import asyncio
+        if self.qit.max_runs is None:
+            yield
+            return
+        # Slots are shared with threads; they are polled, so the event loop
+        # is not blocked and a cancelled wait does not take a slot
+        while not self.run_slots.acquire(blocking=False):
+            await asyncio.sleep(0.01)
+        try:
+            yield
+        finally:
+            self.run_slots.release()
+
+    async def start_program_async(self, exe_filename, input=None):
+        import asyncio
+        # Output is written into a pipe inherited by the program,
+        # hence no files have to be cleaned after the run
+        loop = asyncio.get_running_loop()
+        read_fd, write_fd = os.pipe()
+        try:
+            args = (exe_filename, "/dev/fd/{}".format(write_fd))
+            LOG.debug("Running: %s", args)
+            process = await asyncio.create_subprocess_exec(
+                *args,
+                stdin=subprocess.PIPE if input is not None else None,
+                pass_fds=(write_fd,))
+        except BaseException:
+            os.close(read_fd)
+            raise
+        finally:
+            os.close(write_fd)
+        reader = asyncio.StreamReader()
+        try:
+            transport, protocol = await loop.connect_read_pipe(
+                lambda: asyncio.StreamReaderProtocol(reader),
+                os.fdopen(read_fd, "rb", 0))
+            if input is not None:
+                process.stdin.write(input)
+                await process.stdin.drain()
+                process.stdin.close()
+        except BaseException:
+            process.kill()
+            await process.wait()
+            raise
+        return process, reader, transport
+
+    async def stop_program_async(self, process, transport):
+        transport.close()
+        if process.returncode is None:
+            process.kill()
+            await process.wait()
+
     def declarations(self, obj):
         builder = CppBuilder(self)
         return [builder.get_function_declaration(fn) for fn in obj.get_functions()
@@ -0,0 +1,134 @@
+from qit.build.builder import CppBuilder
+from qit.base.exception import QitException, NotConstant
+
+# Queries that enumerate more elements are reported
+LARGE_SIZE = 10 ** 8
+
+
+# Description of a query before it is compiled: tree of iterators with
+# estimated sizes, iterators that keep all their elements in memory and
+# the size of the generated code
+class Explanation(object):
+
+    def __init__(self, env, obj, args=None):
+        from qit.domains.domain import Domain
+        from qit.domains.iterator import Iterator
+        self.values = dict(args) if args is not None else {}
+        self.lines = []
+        self.warnings = []
+
+        if isinstance(obj, Domain):
+            self.lines.append("Domain of {}, size {}".format(
+                obj.type, format_size(self.size_value(obj))))
+            if obj.iterator is None:
+                obj = obj.generate()
+            else:
+                obj = obj.iterate()
+        if isinstance(obj, Iterator):
+            self.lines.append("to_vector (materialized)")
+            size = self.explain_iterator(obj, 1, 1)
+            if size is None:
+                self.warnings.append("Size of the result is unknown")
+            elif size > LARGE_SIZE:
+                self.warnings.append(
+                    "Result has about {} elements".format(size))
+        else:
+            self.lines.append("Expression of type {}".format(obj.type))
+
+        builder = CppBuilder(env)
+        builder.write_header(obj)
+        obj.declare_all(builder)
+        self.code = builder.get_string()
+
+    def size_value(self, domain):
+        try:
+            return domain.size_value(self.values)
+        except QitException:
+            return None
+
+    def estimate_size(self, iterator):
+        try:
+            return iterator.estimate_size(self.values)
+        except NotConstant:
+            return None
+
+    def is_exact(self, iterator):
+        from qit.domains.transformation import FilterTransformation
+        if isinstance(iterator, FilterTransformation):
+            return False
+        return all(self.is_exact(i) for i in iterator.get_iterators())
+
+    def explain_iterator(self, iterator, depth, resets):
+        from qit.domains.transformation import FilterTransformation
+        from qit.domains.product import ProductIterator
+        from qit.domains.sequence import SequenceIterator
+        size = self.estimate_size(iterator)
+        # Name is used only in the text
+        name = iterator.__class__.__name__
+        for suffix in ("Iterator", "Transformation"):
+            if name.endswith(suffix) and name != suffix:
+                name = name[:-len(suffix)]
+        # Filters give only upper bounds
+        bound = "" if self.is_exact(iterator) else "<="
+        line = "{}{} size {}{}".format(
+            "  " * depth, name, bound, format_size(size))
+        if resets is None or resets > 1:
+            line += ", reset {} times".format(format_size(resets))
+        if iterator.materializes:
+            line += " (materialized)"
+        self.lines.append(line)
+
+        if resets is None or resets > 1:
+            if iterator.recomputed_by_reset:
+                self.warnings.append(
+                    "{} is recomputed by each of {} resets; "
+                    "make it the last component of the product".format(
+                        name, format_size(resets)))
+            elif isinstance(iterator, FilterTransformation):
+                self.warnings.append(
+                    "Filter is evaluated again by each of {} resets; "
+                    "filter fields of the product or use cache()".format(
+                        format_size(resets)))
+
+        childs = iterator.get_iterators()
+        if iterator.materializes and not iterator.recomputed_by_reset:
+            # Elements are computed only once
+            resets = 1
+        if isinstance(iterator, ProductIterator):
+            # The first component changes most often
+            for i, child in enumerate(childs):
+                child_resets = resets
+                for other in childs[i + 1:]:
+                    child_resets = multiply(child_resets,
+                                            self.estimate_size(other))
+                self.explain_iterator(child, depth + 1, child_resets)
+        else:
+            if isinstance(iterator, SequenceIterator) and childs:
+                # An element is reset when the previous one overflows
+                inner_size = self.estimate_size(childs[0])
+                if inner_size:
+                    resets = multiply(resets, size)
+                    if resets is not None:
+                        resets //= inner_size
+            for child in childs:
+                self.explain_iterator(child, depth + 1, resets)
+        return size
+
+    def get_text(self):
+        lines = list(self.lines)
+        lines.append("Generated code: {} bytes, {} lines".format(
+            len(self.code), self.code.count("\n")))
+        for warning in self.warnings:
+            lines.append("Warning: " + warning)
+        return "\n".join(lines)
+
+
+def multiply(a, b):
+    if a is None or b is None:
+        return None
+    return a * b
+
+def format_size(size):
+    if size is None:
+        return "?"
+    return str(size)
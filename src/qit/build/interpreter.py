@@ -0,0 +1,39 @@
+from qit.base.exception import NotConstant
+from qit.base.utils import bind_arguments, bind_iterator_arguments
+
+import logging
+
+LOG = logging.getLogger("qit")
+
+
+# Evaluates queries directly in Python, without generating and compiling
+# C++. Only iterators that implement 'iterate_python' and functions with a
+# Python counterpart (see Function.evaluates) are supported; NotConstant is
+# raised otherwise. When 'limit' is set, iterators whose estimated size is
+# unknown or exceeds the limit are refused, too.
+class Interpreter(object):
+
+    def __init__(self, limit=None):
+        self.limit = limit
+
+    def run(self, obj, args=None):
+        from qit.domains.domain import Domain
+        from qit.domains.iterator import Iterator
+        if isinstance(obj, (Domain, Iterator)):
+            return self.run_iterator(*bind_iterator_arguments(obj, args))
+        expr, values = bind_arguments(obj, args)
+        return expr.evaluate(self.make_values(values))
+
+    def run_iterator(self, iterator, values):
+        values = self.make_values(values)
+        if self.limit is not None:
+            size = iterator.estimate_size(values)
+            if size is None or size > self.limit:
+                raise NotConstant(iterator)
+        result = list(iterator.iterate_python(values))
+        LOG.debug("Query evaluated in Python (%s element(s))", len(result))
+        return result
+
+    def make_values(self, values):
+        return dict((variable.name, value.evaluate())
+                    for variable, value in values.items())
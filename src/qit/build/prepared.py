@@ -0,0 +1,49 @@
+from qit.base.utils import sorted_variables, write_arguments
+from qit.base.exception import QitException
+
+import io
+
+
+class PreparedQuery(object):
+
+    def __init__(self, env, obj, builder, pgo=False, training_args=None):
+        self.env = env
+        self.obj = obj
+        self.variables = sorted_variables(obj.get_variables())
+        self.builder = builder
+        self.pgo = pgo
+        if pgo:
+            # A profile collected on arguments of a run would make the
+            # optimized program depend on the first binding used
+            if training_args is None:
+                if self.variables:
+                    raise QitException(
+                        "Profile-guided optimization needs 'training_args'")
+                training_args = {}
+            self.training_input = self.serialize_arguments(training_args)
+            env.build_pgo_program(builder, obj.type, self.training_input)
+        else:
+            self.key = env.get_program_key(builder)
+            env.build_program(builder, self.key)
+
+    def serialize_arguments(self, args):
+        f = io.BytesIO()
+        write_arguments(f, self.variables, args)
+        return f.getvalue()
+
+    def get_program(self):
+        # Program is obtained again for each run, since it may be evicted
+        # from the cache or replaced by a better optimized version
+        if self.pgo:
+            return self.env.build_pgo_program(
+                self.builder, self.obj.type, self.training_input)
+        return self.env.build_program(self.builder, self.key)
+
+    def run(self, args=None, **kw):
+        if args is None:
+            args = {}
+        args = dict(args, **kw)
+        data = self.serialize_arguments(args)
+        filename = self.get_program()
+        return self.env.execute(
+            filename, self.obj.type, data, self.builder.execution)
@@ -0,0 +1,23 @@
+from qit.base.int import Int
+from qit.base.exception import QitException
+
+
+# Reader of output of a program built from several expressions;
+# each result is preceded by the index of its section
+class Sections(object):
+
+    tag_type = Int()
+
+    def __init__(self, types):
+        self.types = types
+
+    def read(self, f):
+        results = []
+        for i, type in enumerate(self.types):
+            tag = self.tag_type.read(f)
+            if tag != i:
+                raise QitException(
+                    "Invalid section in output: expected {}, got {}".format(
+                        i, tag))
+            results.append(type.read(f))
+        return results
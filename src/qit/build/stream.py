@@ -0,0 +1,36 @@
+from qit.base.int import Int
+
+import io
+
+# Output of a streamed iterator is a sequence of frames; each frame is
+# the size of the element followed by the element itself
+
+class Frames(object):
+
+    def __init__(self, type):
+        self.type = type
+
+    def read(self, f):
+        return list(read_frames(f, self.type))
+
+def read_frames(f, type):
+    size_type = Int()
+    while True:
+        size = size_type.read(f)
+        if size is None:
+            return
+        yield type.read(io.BytesIO(f.read(size)))
+
+async def read_frames_async(reader, type):
+    import asyncio
+    size_type = Int()
+    while True:
+        try:
+            data = await reader.readexactly(size_type.struct_size)
+        except asyncio.IncompleteReadError as e:
+            if e.partial:
+                raise
+            return
+        size = size_type.read(io.BytesIO(data))
+        data = await reader.readexactly(size)
+        yield type.read(io.BytesIO(data))
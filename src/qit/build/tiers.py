@@ -0,0 +1,125 @@
+from qit.base.exception import QitException
+
+import copy
+import threading
+import time
+import logging
+
+LOG = logging.getLogger("qit")
+
+
+class TierInfo(object):
+
+    def __init__(self, key):
+        self.key = key
+        self.tier = "quick"
+        self.promotion = None
+        self.runs = 0
+        self.total_run_time = 0.0
+        self.last_run_time = None
+        self.compile_times = {}
+
+    def __repr__(self):
+        return "TierInfo({}, tier={}, runs={}, promotion={})".format(
+            self.key, self.tier, self.runs, repr(self.promotion))
+
+
+# Programs are first compiled with cheap optimization flags. A program that
+# is executed repeatedly or that runs for a long time is recompiled with full
+# optimizations in a background thread; the optimized program replaces the
+# quick one when it is ready.
+class TierManager(object):
+
+    def __init__(self, env, promote_runs, promote_threshold):
+        self.env = env
+        self.promote_runs = promote_runs
+        self.promote_threshold = promote_threshold
+        self.lock = threading.Lock()
+        self.infos = {}
+        # Filenames of programs -> infos
+        self.programs = {}
+        # Builders are kept only until the optimized program is built
+        self.builders = {}
+        self.threads = []
+
+    def get_program(self, builder, key):
+        with self.lock:
+            info = self.infos.get(key)
+            if info is None:
+                info = TierInfo(key)
+                self.infos[key] = info
+
+        filename = self.env.get_cached_program(key)
+        if filename is not None:
+            with self.lock:
+                if info.tier != "optimized":
+                    info.tier = "optimized"
+                    if info.promotion is None:
+                        info.promotion = "found in cache"
+                self.builders.pop(key, None)
+                self.programs[filename] = info
+            return filename
+
+        flags = self.env.quick_optimization_flags
+        quick_key = self.env.get_program_key(builder, flags)
+        filename = self.env.get_cached_program(quick_key)
+        if filename is None:
+            start = time.time()
+            filename = self.env.compile_program(builder, quick_key, flags)
+            with self.lock:
+                info.compile_times["quick"] = time.time() - start
+        with self.lock:
+            if info.tier == "quick":
+                self.builders[key] = builder
+            self.programs[filename] = info
+        return filename
+
+    def record_run(self, filename, run_time):
+        with self.lock:
+            info = self.programs.get(filename)
+            if info is None:
+                return
+            info.runs += 1
+            info.total_run_time += run_time
+            info.last_run_time = run_time
+            if info.tier != "quick":
+                return
+            if info.runs >= self.promote_runs:
+                info.promotion = "executed {} times".format(info.runs)
+            elif run_time > self.promote_threshold:
+                info.promotion = "run took {:.3f}s".format(run_time)
+            else:
+                return
+            info.tier = "optimizing"
+            builder = self.builders.pop(info.key)
+            LOG.info("Optimizing program %s: %s", info.key, info.promotion)
+            thread = threading.Thread(target=self.optimize,
+                                      args=(info, builder),
+                                      daemon=True)
+            self.threads.append(thread)
+        thread.start()
+
+    def optimize(self, info, builder):
+        start = time.time()
+        try:
+            filename = self.env.compile_program(builder, info.key)
+        except QitException as e:
+            LOG.warning("Optimized compilation of %s failed: %s", info.key, e)
+            with self.lock:
+                info.tier = "failed"
+            return
+        with self.lock:
+            info.compile_times["optimized"] = time.time() - start
+            info.tier = "optimized"
+            self.programs[filename] = info
+
+    def wait(self):
+        with self.lock:
+            threads = list(self.threads)
+        for thread in threads:
+            thread.join()
+
+    def get_stats(self):
+        with self.lock:
+            return dict((key, copy.copy(info))
+                        for key, info in self.infos.items())
@@ -7,11 +7,18 @@ class CppWriter(object):
         self.indent = ""
 
     def line(self, string, *a, **kw):
-        self.lines.append(self.indent + string.format(*a, **kw))
+        if a or kw or "{" in string or "}" in string:
+            string = string.format(*a, **kw)
+        if self.indent:
+            string = self.indent + string
+        self.lines.append(string)
 
     def text(self, text):
-        for line in text.split("\n"):
-            self.lines.append(self.indent + line)
+        indent = self.indent
+        if indent:
+            self.lines.extend(indent + line for line in text.split("\n"))
+        else:
+            self.lines.extend(text.split("\n"))
 
     def emptyline(self):
         self.lines.append("")
@@ -18,6 +18,13 @@ class Domain(QitObject):
             self.size = None
         self.indexer = indexer
 
+    def size_value(self, args=None):
+        if self.size is None:
+            raise QitException(
+                    "Domain '{}' does not have a size".format(repr(self)))
+        # Size is exact, it is not limited by the range of qint
+        return self.size.evaluate(args, wrap=False)
+
     def iterate(self):
         if self.iterator is None:
             raise QitException(
@@ -40,10 +47,9 @@ class Domain(QitObject):
         return self
 
     def __mul__(self, other):
+        from qit.domains.product import Product
         return Product(self, other)
 
 def check_domain(obj, have_iterator=False):
     if not isinstance(obj, Domain):
         raise QitException("{} is not domain".format(obj))
-
-from qit.domains.product import Product
@@ -4,12 +4,12 @@ from qit.base.enum import Enum
 from qit.base.function import Function
 from qit.domains.iterator import Iterator
 from qit.domains.domain import Domain
-from qit.functions.random import rand_int
 
 
 class Enumerate(Domain):
 
     def __init__(self, *names):
+        from qit.functions.random import rand_int
         type = Enum(*names)
         iterator = EnumIterator(type)
         generator = Function().returns(type).code("""
@@ -30,3 +30,9 @@ class EnumIterator(Iterator):
         self.next_fn.code("iter = static_cast<{{type}}>(iter + 1);", type=enum)
         self.is_valid_fn.code("return iter < {{_size}};", _size=len(enum.names))
         self.value_fn.code("return iter;")
+
+    def iterate_python(self, values):
+        return iter(self.element_type.names)
+
+    def estimate_size(self, values):
+        return len(self.element_type.names)
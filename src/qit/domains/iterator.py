@@ -2,11 +2,20 @@
 from qit.base.function import Function
 from qit.base.bool import Bool
 from qit.base.vector import Vector
+from qit.base.int import Int
+from qit.base.file import File
 from qit.base.qitobject import QitObject
+from qit.base.exception import NotConstant, QitException
+from qit.base.eqmixin import HashableEqMixin
 
 
 class Iterator(QitObject):
 
+    # Iterator keeps all its elements in memory
+    materializes = False
+    # Elements are computed again after each reset
+    recomputed_by_reset = False
+
     def __init__(self, itype, element_type):
         self.itype = itype
         self.element_type = element_type
@@ -14,50 +23,233 @@ class Iterator(QitObject):
         self.next_fn = Function().takes(itype, "iter", const=False)
         self.is_valid_fn = Function().takes(itype, "iter").returns(Bool())
         self.value_fn = Function().takes(itype, "iter").returns(element_type)
+        # advance_fn(iter, out) stores the next element into 'out' and
+        # moves the iterator forward; it returns false when there are no more
+        # elements (then only reset_fn may be called). 'out' is owned by
+        # the caller and keeps the element of the previous call, hence it may
+        # be updated in place. When it is None, get_advance_fn() builds it
+        # from the functions above. A function created by make_advance_fn()
+        # is used only while the functions above are those it was written
+        # for; when any of them is replaced, get_advance_fn() also falls
+        # back to the functions above.
+        self.advance_fn = None
+        self.advance_basis = None
 
     @property
     def childs(self):
-        return (self.itype,
-                self.reset_fn,
-                self.next_fn,
-                self.is_valid_fn,
-                self.value_fn)
+        childs = (self.itype,
+                  self.reset_fn,
+                  self.next_fn,
+                  self.is_valid_fn,
+                  self.value_fn)
+        if self.has_native_advance():
+            childs += (self.advance_fn,)
+        return childs
+
+    def get_basic_functions(self):
+        return (self.reset_fn, self.next_fn, self.is_valid_fn, self.value_fn)
+
+    def make_advance_fn(self):
+        self.advance_basis = self.get_basic_functions()
+        return self.make_advance_signature()
+
+    def make_advance_signature(self):
+        return Function().takes(self.itype, "iter", const=False) \
+                         .takes(self.element_type, "out", const=False) \
+                         .returns(Bool())
+
+    def has_native_advance(self):
+        if self.advance_fn is None:
+            return False
+        return self.advance_basis is None or \
+            all(a is b for a, b in zip(self.advance_basis,
+                                       self.get_basic_functions()))
+
+    def get_advance_fn(self):
+        if self.has_native_advance():
+            return self.advance_fn
+        return self.make_advance_signature().code("""
+            if (!{{is_valid_fn}}(iter)) {
+                return false;
+            }
+            out = {{value_fn}}(iter);
+            {{next_fn}}(iter);
+            return true;
+        """, is_valid_fn=self.is_valid_fn,
+             value_fn=self.value_fn,
+             next_fn=self.next_fn)
+
+    # Inner iterators (used by qit.build.explain)
+    def get_iterators(self):
+        return ()
+
+    # Evaluation in Python (see qit.build.interpreter); 'values' maps names
+    # of variables to their values
+
+    def iterate_python(self, values):
+        raise NotConstant(self)
+
+    def estimate_size(self, values):
+        return None
 
     # Transformations
 
     def take(self, count):
+        from qit.domains.transformation import TakeTransformation
         return TakeTransformation(self, count)
 
     def map(self, function):
+        from qit.domains.transformation import MapTransformation
         return MapTransformation(self, function)
 
     def sort(self, asceding=True):
+        from qit.domains.transformation import SortTransformation
         return SortTransformation(self, asceding)
 
-    def filter(self, function):
-        return FilterTransformation(self, function)
+    def filter(self, function=None, _all=None, **fields):
+        # Keyword arguments filter fields of elements (a conjunction of
+        # all filters is applied); '_all' is the same as 'function'
+        from qit.domains.transformation import FilterTransformation
+        iterator = self
+        if fields:
+            iterator = iterator.filter_fields(fields)
+        for f in (function, _all):
+            if f is not None:
+                iterator = FilterTransformation(iterator, f)
+        if iterator is self:
+            raise QitException("No filter function")
+        return iterator
+
+    def filter_fields(self, fields):
+        from qit.domains.transformation import FilterTransformation
+        names = self.get_field_names(fields)
+        functions = tuple(fields[name] for name in names)
+        f = Function().takes(self.element_type, "value").returns(Bool())
+        f.code("""
+            return
+            {%- for name, function in _fields %}
+                {{b(function)}}(value.{{name}})
+                {%- if not loop.last %} &&{% endif %}
+            {%- endfor %};
+        """, _fields=tuple(zip(names, functions))).uses(functions)
+        if all(function.pure for function in functions):
+            indices = tuple(self.element_type.names.index(name)
+                            for name in names)
+            f.evaluates(lambda value: all(
+                function.python_function(value[i])
+                for i, function in zip(indices, functions)))
+        return FilterTransformation(self, f)
+
+    def get_field_names(self, fields):
+        from qit.base.struct import Struct
+        if not isinstance(self.element_type, Struct):
+            raise QitException(
+                "Fields cannot be filtered, elements are not structs")
+        for name in fields:
+            if name not in self.element_type.names:
+                raise QitException("Unknown field '{}'".format(name))
+        return sorted(fields)
+
+    def cache(self):
+        from qit.domains.transformation import CacheTransformation
+        return CacheTransformation(self)
+
+    # Source iterator and transformations (see qit.domains.transformation)
+    # applied on its elements; consumers fuse them into a single loop
+    def get_pipeline(self):
+        return self, ()
+
+    def make_loop(self, body):
+        # Code of a loop that runs 'body' for each element; the element is
+        # available in body as {{_value}}
+        source, stages = self.get_pipeline()
+        kw = { "loop_itype": source.itype,
+               "loop_reset_fn": source.reset_fn,
+               "loop_type0": source.element_type }
+        init = []
+        counters = []
+        lines = []
+        value = "value0"
+        for i, stage in enumerate(stages, 1):
+            name = "loop_stage{}".format(i)
+            kw[name] = stage.get_stage_object()
+            if isinstance(stage, MapStage):
+                kw["loop_type{}".format(i)] = stage.function.return_type
+                lines.append("{{{{loop_type{0}}}}} value{0} = "
+                             "{{{{{1}}}}}({2});".format(i, name, value))
+                value = "value{}".format(i)
+            elif isinstance(stage, FilterStage):
+                lines.append("if (!{{{{{}}}}}({})) break;".format(name, value))
+            else:
+                init.append("qint take{0} = {{{{{1}}}}};".format(i, name))
+                counters.append("take{} > 0".format(i))
+                lines.append("take{}--;".format(i))
+        lines.append(body)
+        kw["_value"] = value
+        # Take counters are checked before the source is moved forward,
+        # hence the source is not touched after the last taken element
+        condition = " && ".join(counters)
+        check = condition + " && " if counters else ""
+        init += ["{{loop_itype}} iterator;", "{{loop_reset_fn}}(iterator);"]
+        if source.has_native_advance():
+            kw["loop_advance_fn"] = source.get_advance_fn()
+            code = "\n".join(init + [
+                "{{loop_type0}} value0;",
+                "while({}{{{{loop_advance_fn}}}}(iterator, value0)) {{".format(
+                    check),
+                "    do {"] + ["        " + line for line in lines] + [
+                "    } while(false);",
+                "}"])
+            return code, kw
+        # Without a native advance_fn, the source would be moved forward
+        # already when its last taken element is read
+        kw["loop_next_fn"] = source.next_fn
+        kw["loop_is_valid_fn"] = source.is_valid_fn
+        kw["loop_value_fn"] = source.value_fn
+        lines.insert(0, "{{loop_type0}} value0 = {{loop_value_fn}}(iterator);")
+        code = "\n".join(init + [
+            "while({}{{{{loop_is_valid_fn}}}}(iterator)) {{".format(check),
+            "    do {"] + ["        " + line for line in lines] + [
+            "    } while(false);"] + (
+            ["    if (!({})) break;".format(condition)] if counters else []) + [
+            "    {{loop_next_fn}}(iterator);",
+            "}"])
+        return code, kw
 
     def to_vector(self):
         vector = Vector(self.element_type)
         f = Function(returns=vector)
+        code, kw = self.make_loop("output.push_back({{_value}});")
+        f.code("{{vector}} output;\n" + code + "\nreturn output;",
+               vector=vector, **kw)
+        return f()
+
+    @property
+    def stream_function(self):
+        # Writes elements as frames: size of the element followed by
+        # the element, hence elements can be read as they are produced
+        f = Function().takes(File(), "output")
+        code, kw = self.make_loop("""
+            rewind(frame);
+            {{write_fn}}(frame, {{_value}});
+            fflush(frame);
+            qint size = ftell(frame);
+            {{write_int}}(output, size);
+            fwrite(frame_data, 1, size, output);
+        """)
         f.code(
             """
-                {{vector}} output;
-                {{itype}} iterator;
-                {{reset_fn}}(iterator);
-                while({{is_valid_fn}}(iterator)) {
-                    output.push_back({{value_fn}}(iterator));
-                    {{next_fn}}(iterator);
-                };
-                return output;
+                char *frame_data = NULL;
+                size_t frame_size = 0;
+                FILE *frame = open_memstream(&frame_data, &frame_size);
+            """ + code + """
+                fclose(frame);
+                free(frame_data);
             """,
-            itype=self.itype,
-            reset_fn=self.reset_fn,
-            next_fn=self.next_fn,
-            is_valid_fn=self.is_valid_fn,
-            value_fn=self.value_fn,
-            vector=vector)
-        return f()
+            write_fn=self.element_type.write_function,
+            write_int=Int().write_function,
+            **kw)
+        return f
 
     def make_function(self, *args, **kw):
         return self.get_expression().make_function(*args, **kw)
@@ -66,7 +258,28 @@ class Iterator(QitObject):
         return self.to_vector()
 
 
-# To broke import cycle, we import following packages at the end
-from qit.domains.transformation import TakeTransformation, FilterTransformation
-from qit.domains.transformation import MapTransformation
-from qit.domains.transformation import SortTransformation
+class MapStage(HashableEqMixin):
+
+    def __init__(self, function):
+        self.function = function
+
+    def get_stage_object(self):
+        return self.function
+
+
+class FilterStage(HashableEqMixin):
+
+    def __init__(self, function):
+        self.function = function
+
+    def get_stage_object(self):
+        return self.function
+
+
+class TakeStage(HashableEqMixin):
+
+    def __init__(self, count):
+        self.count = count
+
+    def get_stage_object(self):
+        return self.count
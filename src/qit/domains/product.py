@@ -6,6 +6,8 @@ from qit.domains.iterator import Iterator
 from qit.base.function import Function
 from qit.functions.int import multiplication_n
 
+import itertools
+
 class Product(Domain):
 
     def __init__(self, *args):
@@ -71,19 +73,27 @@ class ProductIterator(Iterator):
 
     def __init__(self, struct, iterators):
         iters = tuple(zip(struct.names, iterators))
-        itype = Struct(*((i.itype, name) for name, i in iters))
+        # '_started' is set by the first call of advance_fn after reset
+        itype = Struct(*(tuple((i.itype, name) for name, i in iters) +
+                         ((Bool(), "_started"),)))
 
-        objects = set()
+        # Objects are collected in a stable order, so the generated code
+        # does not depend on hashing and can be cached between runs
+        objects = []
         for i in iterators:
-            objects.update(i.childs)
+            for obj in i.childs:
+                if obj not in objects:
+                    objects.append(obj)
         objects = tuple(objects)
 
         super().__init__(itype, struct)
+        self.iterators = tuple(iterators)
 
         self.reset_fn.code("""
             {%- for name, i in _iters %}
                 {{b(i.reset_fn)}}(iter.{{name}});
             {%- endfor %}
+            iter._started = false;
         """, _iters=iters, struct=struct).uses(objects)
 
         self.next_fn.code("""
@@ -115,3 +125,59 @@ class ProductIterator(Iterator):
             {%- endfor %}
             };
         """, _iters=iters, struct=struct).uses(objects)
+
+        # Only components that are moved are written into 'out'
+        advance_fns = tuple(i.get_advance_fn() for i in iterators)
+        self.advance_fn = self.make_advance_fn().code("""
+            if (!iter._started) {
+                iter._started = true;
+                return
+                {%- for name, i, advance_fn in _iters %}
+                    {{b(advance_fn)}}(iter.{{name}}, out.{{name}})
+                    {%- if not loop.last %} &&{% endif %}
+                {%- endfor %};
+            }
+            {%- for name, i, advance_fn in _iters[:-1] %}
+            if ({{b(advance_fn)}}(iter.{{name}}, out.{{name}})) {
+                return true;
+            }
+            {{b(i.reset_fn)}}(iter.{{name}});
+            {{b(advance_fn)}}(iter.{{name}}, out.{{name}});
+            {%- endfor %}
+            return {{b(_iters[-1][2])}}(iter.{{_iters[-1][0]}},
+                                        out.{{_iters[-1][0]}});
+        """, _iters=tuple((name, i, a) for (name, i), a
+                          in zip(iters, advance_fns))).uses(
+                              objects + advance_fns)
+
+    def get_iterators(self):
+        return self.iterators
+
+    def filter_fields(self, fields):
+        # Filters are applied on components, hence filtered components
+        # are enumerated once. All components except the last one are reset
+        # repeatedly, so their filtered elements are cached.
+        iterators = list(self.iterators)
+        names = self.element_type.names
+        for name in self.get_field_names(fields):
+            i = names.index(name)
+            iterator = iterators[i].filter(fields[name])
+            if i < len(iterators) - 1:
+                iterator = iterator.cache()
+            iterators[i] = iterator
+        return ProductIterator(self.element_type, iterators)
+
+    def iterate_python(self, values):
+        # The first component changes most often
+        items = [ tuple(i.iterate_python(values))
+                  for i in reversed(self.iterators) ]
+        return (tuple(reversed(p)) for p in itertools.product(*items))
+
+    def estimate_size(self, values):
+        size = 1
+        for i in self.iterators:
+            s = i.estimate_size(values)
+            if s is None:
+                return None
+            size *= s
+        return size
@@ -1,15 +1,16 @@
 
-from qit.base.int import Int
+from qit.base.int import Int, wrap_int
 from qit.base.function import Function
+from qit.base.exception import NotConstant
 from qit.domains.iterator import Iterator
 from qit.domains.domain import Domain
-from qit.functions.random import rand_int
-from qit.functions.int import identity
 
 
 class Range(Domain):
 
     def __init__(self, start, end=None, step=1):
+        from qit.functions.random import rand_int
+        from qit.functions.int import identity
         if end is None:
             end = start
             start = 0
@@ -45,6 +46,14 @@ range_size.takes(Int(), "end")
 range_size.takes(Int(), "step")
 range_size.returns(Int())
 range_size.code("return (end - start) / step;")
+range_size.evaluates(
+    lambda start, end, step: c_division(wrap_int(end - start), step))
+
+
+def c_division(a, b):
+    # Division that rounds toward zero as in C++
+    q = abs(a) // abs(b)
+    return q if (a < 0) == (b < 0) else -q
 
 
 class RangeIterator(Iterator):
@@ -52,7 +61,34 @@ class RangeIterator(Iterator):
     def __init__(self, start, end, step):
         itype = Int()
         super().__init__(itype, Int())
+        from qit.functions.int import identity
+        self.start = start
+        self.end = end
+        self.step = step
         self.reset_fn.code("iter = {{start}};", start=start)
         self.next_fn.code("iter+={{step}};", step=step)
         self.is_valid_fn.code("return iter < {{end}};", end=end)
         self.value_fn = identity
+        self.advance_fn = self.make_advance_fn().code("""
+            if (!(iter < {{end}})) {
+                return false;
+            }
+            out = iter;
+            iter += {{step}};
+            return true;
+        """, end=end, step=step)
+
+    def get_range(self, values):
+        start = self.start.evaluate(values)
+        end = self.end.evaluate(values)
+        step = self.step.evaluate(values)
+        if step <= 0:
+            # Generated code does not stop if start < end
+            raise NotConstant(self)
+        return range(start, end, step)
+
+    def iterate_python(self, values):
+        return iter(self.get_range(values))
+
+    def estimate_size(self, values):
+        return len(self.get_range(values))
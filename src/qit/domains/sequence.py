@@ -1,10 +1,12 @@
 from qit.base.int import Int
 from qit.base.bool import Bool
 from qit.base.vector import Vector
+from qit.base.struct import Struct
 from qit.domains.domain import Domain
 from qit.domains.iterator import Iterator
 from qit.base.function import Function
-from qit.functions.int import power
+
+import itertools
 
 class Sequence(Domain):
 
@@ -32,6 +34,7 @@ class Sequence(Domain):
 
         if domain.size is not None:
             size = Int().value(size)
+            from qit.functions.int import power
             domain_size = power(domain.size, size)
         else:
             domain_size = None
@@ -43,21 +46,25 @@ class SequenceIterator(Iterator):
 
     def __init__(self, iterator, size):
         size = Int().value(size)
-        itype = Bool() * Vector(iterator.itype)
+        # v2 is set by the first call of advance_fn after reset
+        itype = Struct(Bool(), Vector(iterator.itype), Bool())
         element_type = Vector(iterator.element_type)
 
         super().__init__(itype, element_type)
+        self.iterator = iterator
+        self.size = size
 
         self.reset_fn.code("""
             {{inner_itype}} item;
             {{reset_fn}}(item);
             iter.v1 = {{ivector}}({{size}}, item);
             iter.v0 = std::all_of(iter.v1.begin(), iter.v1.end(), {{is_valid_fn}});
+            iter.v2 = false;
         """, ivector=itype.types[1],
              size=size,
              inner_itype=iterator.itype,
              is_valid_fn=iterator.is_valid_fn,
-             reset_fn=iterator.reset_fn)
+             reset_fn=iterator.reset_fn).includes("algorithm")
 
         self.next_fn.code("""
             size_t size = iter.v1.size();
@@ -90,3 +97,48 @@ class SequenceIterator(Iterator):
             }
             return result;
         """, type=element_type, value_fn=iterator.value_fn)
+
+        # Elements of std::vector<bool> cannot be passed by reference
+        if iterator.element_type != Bool():
+            self.advance_fn = self.make_advance_fn().code("""
+                size_t size = iter.v1.size();
+                if (!iter.v2) {
+                    iter.v2 = true;
+                    out.resize(size);
+                    for (size_t i = 0; i < size; i++) {
+                        if (!{{advance_fn}}(iter.v1[i], out[i])) {
+                            return false;
+                        }
+                    }
+                    return true;
+                }
+                if (size == 0) {
+                    return false;
+                }
+                size_t i;
+                for (i = 0; i < size - 1; i++) {
+                    if ({{advance_fn}}(iter.v1[i], out[i])) {
+                        return true;
+                    }
+                    {{reset_fn}}(iter.v1[i]);
+                    {{advance_fn}}(iter.v1[i], out[i]);
+                }
+                return {{advance_fn}}(iter.v1[i], out[i]);
+            """, advance_fn=iterator.get_advance_fn(),
+                 reset_fn=iterator.reset_fn)
+
+    def get_iterators(self):
+        return (self.iterator,)
+
+    def iterate_python(self, values):
+        # The first element changes most often
+        items = tuple(self.iterator.iterate_python(values))
+        size = self.size.evaluate(values)
+        return (list(reversed(p))
+                for p in itertools.product(items, repeat=size))
+
+    def estimate_size(self, values):
+        size = self.iterator.estimate_size(values)
+        if size is None:
+            return None
+        return size ** self.size.evaluate(values)
@@ -32,6 +32,9 @@ class System(QitObject):
 
 class StateIterator(Iterator):
 
+    materializes = True
+    recomputed_by_reset = True
+
     def __init__(self, system, depth):
         state_type = system.state_type
         depth = Int().value(depth)
@@ -42,6 +45,7 @@ class StateIterator(Iterator):
                        (Set(state_type), "found_states"),
                        (Int(), "depth"))
         super().__init__(itype, state_type)
+        self.system = system
 
         functions = tuple(rule.function for rule in system.rules)
 
@@ -109,8 +113,11 @@ class StateIterator(Iterator):
         """, _rules=system.rules,
              depth=depth,
              state=state_type,
-             states=Vector(state_type)).uses(functions)
+             states=Vector(state_type)).uses(functions).includes("utility")
 
         self.is_valid_fn.code("return iter.new_count;")
         self.value_fn.code(
             "return iter.next[iter.next.size() - iter.new_count];")
+
+    def get_iterators(self):
+        return (self.system.state_iterator,)
@@ -2,12 +2,17 @@
 from qit.base.int import Int
 from qit.base.vector import Vector
 from qit.base.struct import Struct
-from qit.base.variable import Variable
 from qit.domains.iterator import Iterator
+from qit.domains.iterator import MapStage, FilterStage, TakeStage
+from qit.base.exception import NotConstant
+
+import itertools
 
 
 class Transformation(Iterator):
-    pass
+
+    def get_iterators(self):
+        return (self.iterator,)
 
 
 class TakeTransformation(Transformation):
@@ -16,6 +21,8 @@ class TakeTransformation(Transformation):
         count = Int().value(count)
         itype = Struct(Int(), iterator.itype)
         super().__init__(itype, iterator.element_type)
+        self.iterator = iterator
+        self.count = count
 
         self.reset_fn.code("""
             iter.v0 = {{count}};
@@ -42,26 +49,80 @@ class TakeTransformation(Transformation):
         self.value_fn.code("return {{value_fn}}(iter.v1);",
                 value_fn=iterator.value_fn)
 
+        self.advance_fn = self.make_advance_fn().code("""
+            if (iter.v0 <= 0) {
+                return false;
+            }
+            iter.v0--;
+            return {{advance_fn}}(iter.v1, out);
+        """, advance_fn=iterator.get_advance_fn())
+
+    def get_pipeline(self):
+        source, stages = self.iterator.get_pipeline()
+        return source, stages + (TakeStage(self.count),)
+
+    def iterate_python(self, values):
+        count = max(self.count.evaluate(values), 0)
+        return itertools.islice(self.iterator.iterate_python(values), count)
+
+    def estimate_size(self, values):
+        count = max(self.count.evaluate(values), 0)
+        size = self.iterator.estimate_size(values)
+        if contains_filter(self.iterator):
+            # Filters may skip any number of elements before 'count'
+            # elements are taken, so the size of the source is used
+            return size
+        if size is None:
+            return count
+        return min(size, count)
+
 
 class MapTransformation(Transformation):
 
     def __init__(self, iterator, function):
-        super().__init__(iterator.itype,
-                         function.return_type)
         assert function.return_type is not None
+        # v1 keeps elements of the inner iterator for its advance_fn
+        itype = Struct(iterator.itype, iterator.element_type)
+        super().__init__(itype, function.return_type)
         # TODO: Check compatibility of function and valid return type
-        self.reset_fn = iterator.reset_fn
-        self.next_fn = iterator.next_fn
-        self.is_valid_fn = iterator.is_valid_fn
-        x = Variable(iterator.itype, "_x")
-        self.value_fn = function(iterator.value_fn(x)).make_function((x,))
+        self.iterator = iterator
+        self.function = function
+        self.reset_fn.code("{{reset_fn}}(iter.v0);",
+                           reset_fn=iterator.reset_fn)
+        self.next_fn.code("{{next_fn}}(iter.v0);",
+                          next_fn=iterator.next_fn)
+        self.is_valid_fn.code("return {{is_valid_fn}}(iter.v0);",
+                              is_valid_fn=iterator.is_valid_fn)
+        self.value_fn.code("return {{function}}({{value_fn}}(iter.v0));",
+                           function=function, value_fn=iterator.value_fn)
+        self.advance_fn = self.make_advance_fn().code("""
+            if (!{{advance_fn}}(iter.v0, iter.v1)) {
+                return false;
+            }
+            out = {{function}}(iter.v1);
+            return true;
+        """, advance_fn=iterator.get_advance_fn(), function=function)
+
+    def get_pipeline(self):
+        source, stages = self.iterator.get_pipeline()
+        return source, stages + (MapStage(self.function),)
+
+    def iterate_python(self, values):
+        fn = get_python_function(self.function)
+        return map(fn, self.iterator.iterate_python(values))
+
+    def estimate_size(self, values):
+        return self.iterator.estimate_size(values)
 
 
 class SortTransformation(Transformation):
 
+    materializes = True
+
     def __init__(self, iterator, ascending=True):
         itype = Int() * Vector(iterator.element_type)
         super().__init__(itype, iterator.element_type)
+        self.iterator = iterator
 
         # Since iter.v1 is never changed, we use it to detect
         # if reset_fn is called for the first time,
@@ -72,16 +133,52 @@ class SortTransformation(Transformation):
                 iter.v1 = {{vector}};
                 std::sort(iter.v1.begin(), iter.v1.end());
             }
+        """, vector=iterator.to_vector()).includes("algorithm")
+        self.next_fn.code("iter.v0++;");
+        self.is_valid_fn.code("return iter.v0 < iter.v1.size();");
+        self.value_fn.code("return iter.v1[iter.v0];");
+
+    def iterate_python(self, values):
+        return iter(sorted(self.iterator.iterate_python(values),
+                           key=self.element_type.sort_key))
+
+    def estimate_size(self, values):
+        return self.iterator.estimate_size(values)
+
+
+class CacheTransformation(Transformation):
+
+    materializes = True
+
+    def __init__(self, iterator):
+        itype = Int() * Vector(iterator.element_type)
+        super().__init__(itype, iterator.element_type)
+        self.iterator = iterator
+
+        # Elements are computed by the first reset (as in SortTransformation)
+        self.reset_fn.code("""
+            iter.v0 = 0;
+            if (iter.v1.size() == 0) {
+                iter.v1 = {{vector}};
+            }
         """, vector=iterator.to_vector())
         self.next_fn.code("iter.v0++;");
         self.is_valid_fn.code("return iter.v0 < iter.v1.size();");
         self.value_fn.code("return iter.v1[iter.v0];");
 
+    def iterate_python(self, values):
+        return self.iterator.iterate_python(values)
+
+    def estimate_size(self, values):
+        return self.iterator.estimate_size(values)
+
 
 class FilterTransformation(Transformation):
 
     def __init__(self, iterator, function):
         super().__init__(iterator.itype, iterator.element_type)
+        self.iterator = iterator
+        self.function = function
         self.reset_fn.code("""
             {{reset_fn}}(iter);
             for(;;) {
@@ -117,4 +214,33 @@ class FilterTransformation(Transformation):
             is_valid_fn=iterator.is_valid_fn,
             value_fn=iterator.value_fn,
             function=function)
+        self.advance_fn = self.make_advance_fn().code("""
+            while ({{advance_fn}}(iter, out)) {
+                if ({{function}}(out)) {
+                    return true;
+                }
+            }
+            return false;
+        """, advance_fn=iterator.get_advance_fn(), function=function)
+
+    def get_pipeline(self):
+        source, stages = self.iterator.get_pipeline()
+        return source, stages + (FilterStage(self.function),)
+
+    def iterate_python(self, values):
+        fn = get_python_function(self.function)
+        return filter(fn, self.iterator.iterate_python(values))
+
+    def estimate_size(self, values):
+        return self.iterator.estimate_size(values)
+
+
+def get_python_function(function):
+    if not function.pure:
+        raise NotConstant(function)
+    return function.call_python
+
 
+def contains_filter(iterator):
+    return isinstance(iterator, FilterTransformation) or \
+        any(contains_filter(i) for i in iterator.get_iterators())
@@ -3,24 +3,19 @@ from qit.base.function import Function
 from qit.base.int import Int
 from qit.domains.iterator import Iterator
 from qit.domains.domain import Domain
-from qit.functions.random import rand_int
 
 class Values(Domain):
 
     def __init__(self, type, values):
+        from qit.functions.random import rand_int
         values = tuple(type.value(v) for v in values)
         iterator = ValuesIterator(type, values)
 
         generator = Function().returns(type)
-        generator.code("""
-            switch({{rand_int}}(0, {{_size}})) {
-                {%- for i, v in _values %}
-                case {{i}}: return {{b(v)}};
-                {%- endfor %}
-                default: assert(0);
-            }
-        """, _values=enumerate(values), _size=len(values), rand_int=rand_int)
-        generator.uses(values)
+        generator.code("return {{table}}({{rand_int}}(0, {{_size}}));",
+                       table=make_table(type, values),
+                       rand_int=rand_int,
+                       _size=len(values))
 
         super().__init__(type, iterator, generator())
 
@@ -30,14 +25,52 @@ class ValuesIterator(Iterator):
     def __init__(self, type, values):
         itype = Int()
         super().__init__(itype, type)
+        self.values = values
         self.reset_fn.code("iter = 0;")
         self.next_fn.code("iter++;")
         self.is_valid_fn.code("return iter < {{_size}};", _size=len(values))
-        self.value_fn.code("""
-            switch(iter) {
-                {%- for v in _values %}
-                case {{loop.index0}}: return {{b(v)}};
-                {%- endfor %}
-                default: assert(0);
-            }
-        """, _values=values).uses(values)
+        self.value_fn.code("return {{table}}(iter);",
+                           table=make_table(type, values))
+
+    def iterate_python(self, values):
+        return (v.evaluate(values) for v in self.values)
+
+    def estimate_size(self, values):
+        return len(self.values)
+
+
+# Constant values are stored in one static array, shared by the iterator and
+# the generator, so it is initialized only once; only values that depend on
+# variables are computed in calls, and only the one that is asked for
+def make_table(type, values):
+    expressions = tuple((i, v) for i, v in enumerate(values)
+                        if not is_constant(v))
+    variable = set(i for i, v in expressions)
+    table = Function().takes(Int(), "index").returns(type)
+    table.code("""
+        {%- if _expressions %}
+        switch(index) {
+        {%- for i, v in _expressions %}
+            case {{i}}: return {{b(v)}};
+        {%- endfor %}
+        }
+        {%- endif %}
+        static const {{type}} values[] = {
+        {%- for v in _values %}
+            {% if v is none %}{{type}}(){% else %}{{b(v)}}{% endif %},
+        {%- else %}
+            {{type}}(),
+        {%- endfor %}
+        };
+        return values[index];
+    """, type=type,
+         _values=tuple(None if i in variable else v
+                       for i, v in enumerate(values)),
+         _expressions=expressions)
+    # Constants need no declarations except their type
+    table.uses(tuple(v for i, v in expressions))
+    return table
+
+def is_constant(value):
+    return value.is_constructor() and \
+        all(is_constant(v) for v in value.type.childs_from_value(value.value))
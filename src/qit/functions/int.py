@@ -1,30 +1,71 @@
 from qit.base.function import Function
 from qit.base.int import Int
 
+def multiply(*args):
+    result = 1
+    for a in args:
+        result *= a
+    return result
+
 def multiplication_n(size):
      f = Function().returns(Int())
      for i in range(size):
         f.takes(Int())
      code = "*".join(p.name for p in f.params)
      f.code("return {};".format(code))
+     f.evaluates(multiply)
      return f
 
-# Naive way of making power, but it is sufficient for now
-power = Function().takes(Int(), "base").takes(Int(), "power").returns(Int())
-power.code("""
-    int result = 1;
-    int p = power;
-    while(p > 0) {
-        result *= base;
-        p--;
-    }
-    return result;
-""")
-
-identity = Function().takes(Int(), "a").returns(Int()).code("return a;")
-
-subtract = Function().takes(Int(), "a").takes(Int(), "b").returns(Int())
-subtract.code("return a - b;")
-
-add = Function().takes(Int(), "a").takes(Int(), "b").returns(Int())
-add.code("return a + b;")
+# Functions below are created on the first use (see __getattr__)
+
+def make_power():
+    power = Function().takes(Int(), "base").takes(Int(), "power")
+    power.returns(Int())
+    power.code("""
+        qint result = 1;
+        qint b = base;
+        qint p = power;
+        while(p > 0) {
+            if (p & 1) {
+                result *= b;
+            }
+            p >>= 1;
+            if (p > 0) {
+                b *= b;
+            }
+        }
+        return result;
+    """)
+    power.evaluates(
+        lambda base, power: base ** power if power > 0 else 1)
+    return power
+
+def make_identity():
+    identity = Function().takes(Int(), "a").returns(Int()).code("return a;")
+    return identity.evaluates(lambda a: a)
+
+def make_subtract():
+    subtract = Function().takes(Int(), "a").takes(Int(), "b").returns(Int())
+    subtract.code("return a - b;")
+    return subtract.evaluates(lambda a, b: a - b)
+
+def make_add():
+    add = Function().takes(Int(), "a").takes(Int(), "b").returns(Int())
+    add.code("return a + b;")
+    return add.evaluates(lambda a, b: a + b)
+
+FACTORIES = {
+    "power": make_power,
+    "identity": make_identity,
+    "subtract": make_subtract,
+    "add": make_add,
+}
+
+def __getattr__(name):
+    factory = FACTORIES.get(name)
+    if factory is None:
+        raise AttributeError(
+            "module {!r} has no attribute {!r}".format(__name__, name))
+    value = factory()
+    globals()[name] = value
+    return value
@@ -1,8 +1,25 @@
-
 from qit.base.function import Function
 from qit.base.int import Int
 
-rand_int = Function("rand_int")
-rand_int.takes(Int(), "from").takes(Int(), "to")
-rand_int.returns(Int())
-rand_int.code("return std::uniform_int_distribution<qint>(from, to - 1)(QIT_GENERATOR);")
+# Functions below are created on the first use (see __getattr__)
+
+def make_rand_int():
+    rand_int = Function("rand_int")
+    rand_int.takes(Int(), "from").takes(Int(), "to")
+    rand_int.returns(Int())
+    rand_int.code("return std::uniform_int_distribution<qint>"
+                  "(from, to - 1)(QIT_GENERATOR);")
+    return rand_int
+
+FACTORIES = {
+    "rand_int": make_rand_int,
+}
+
+def __getattr__(name):
+    factory = FACTORIES.get(name)
+    if factory is None:
+        raise AttributeError(
+            "module {!r} has no attribute {!r}".format(__name__, name))
+    value = factory()
+    globals()[name] = value
+    return value
@@ -0,0 +1,39 @@
+/*
+       QIT runtime
+
+       Included by every generated program. Headers required by particular
+       types are included by the generated program itself.
+*/
+
+#ifndef QIT_RUNTIME_HPP
+#define QIT_RUNTIME_HPP
+
+#include <assert.h>
+#include <stdint.h>
+#include <stdio.h>
+#include <stdlib.h>
+#include <time.h>
+#include <random>
+
+typedef int32_t qint;
+
+// Entry points of a program loaded as a library; other symbols are hidden
+#define QIT_EXPORT __attribute__((visibility("default")))
+
+// Thread local, since a program loaded as a library may run in more threads
+extern thread_local std::default_random_engine QIT_GENERATOR;
+
+// Reads the whole input into memory
+inline FILE *qit_buffer_input(FILE *input, char **data, size_t *size)
+{
+	FILE *buffer = open_memstream(data, size);
+	char chunk[4096];
+	size_t n;
+	while ((n = fread(chunk, 1, sizeof(chunk), input)) > 0) {
+		fwrite(chunk, 1, n, buffer);
+	}
+	fclose(buffer);
+	return fmemopen(*data, *size, "r");
+}
+
+#endif // QIT_RUNTIME_HPP
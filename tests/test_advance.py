@@ -0,0 +1,41 @@
+from testutils import Qit, init
+init()
+
+from qit import Range, Product, Sequence, Values, Enumerate, Function
+from qit import Int, Bool, Domain
+
+def check(ctx, it):
+    expected = list(it.iterate_python({}))
+    assert ctx.run(it) == expected
+    return expected
+
+def test_advance_product_sequence():
+    ctx = Qit()
+    f = Function().takes(Int(), "a").returns(Int())
+    f.code("return a * 2;").evaluates(lambda a: a * 2)
+    g = Function().takes(Int(), "a").returns(Bool())
+    g.code("return a != 1;").evaluates(lambda a: a != 1)
+
+    check(ctx, Product(Range(3), Range(0), Range(2)).iterate())
+    check(ctx, Product(Range(1, 4), Range(2)).iterate())
+    check(ctx, Product(Domain(Int(), Range(4).iterate().filter(g).map(f)),
+                       Domain(Int(), Range(3).iterate().take(2))).iterate())
+    check(ctx, Sequence(Range(3), 0).iterate())
+    check(ctx, Sequence(Range(0), 2).iterate())
+    s = Sequence(Product(Range(2), Enumerate("A", "B")), 2)
+    assert len(check(ctx, s.iterate())) == 16
+    check(ctx, Sequence(Range(3), 2).iterate().take(5))
+
+def test_advance_adapter():
+    ctx = Qit()
+    check(ctx, Sequence(Values(Bool(), (True, False)), 2).iterate())
+    check(ctx, Product(Values(Int(), (5, 7)), Enumerate("X", "Y")).iterate())
+
+def test_advance_mixed_with_basic_functions():
+    # Filter moves the inner iterator by basic functions in its reset
+    ctx = Qit()
+    p = Product(Range(3), Sequence(Range(2), 2))
+    f = Function().takes(p.type, "p").returns(Bool())
+    f.code("return p.v0 == 2;").evaluates(lambda p: p[0] == 2)
+    assert check(ctx, p.iterate().filter(f)) == \
+        [ (2, [a, b]) for b in range(2) for a in range(2) ]
@@ -0,0 +1,81 @@
+from testutils import Qit, init
+init()
+
+from qit import Range, Product, Variable, Int, Function
+
+import asyncio
+import os
+import pytest
+
+def test_run_async():
+    ctx = Qit()
+    x = Variable(Int(), "x")
+
+    async def main():
+        return await asyncio.gather(
+            *(ctx.run_async(Range(x).iterate(), { "x": i }) for i in range(4)))
+
+    assert asyncio.run(main()) == [[], [0], [0, 1], [0, 1, 2]]
+
+def test_run_async_library():
+    ctx = Qit(execution="library")
+    p = Range(2) * Range(2)
+    assert asyncio.run(ctx.run_async(p.iterate())) == \
+        [(0, 0), (1, 0), (0, 1), (1, 1)]
+
+def test_iterate():
+    ctx = Qit()
+    p = Product((Range(3), "x"), (Range(2), "y"))
+    assert list(ctx.iterate(p.iterate())) == ctx.run(p.iterate())
+    assert list(ctx.iterate(p)) == ctx.run(p.iterate())
+
+    # Stream of an infinite iterator can be closed
+    it = ctx.iterate(Range(10).generate())
+    assert all(0 <= next(it) < 10 for i in range(1000))
+    it.close()
+    assert not [f for f in os.listdir(ctx.env.build_dir)
+                if f.startswith("qit-")]
+
+def test_iterate_library():
+    ctx = Qit(execution="library")
+    assert list(ctx.iterate(Range(4).iterate().take(2))) == [0, 1]
+
+    # Infinite streams are read while they are produced
+    it = ctx.iterate(Range(10).generate())
+    assert all(0 <= next(it) < 10 for i in range(1000))
+    it.close()
+
+    async def main():
+        result = []
+        async for item in ctx.iterate_async(Range(10).generate()):
+            result.append(item)
+            if len(result) == 100:
+                break
+        return result
+
+    assert all(0 <= i < 10 for i in asyncio.run(main()))
+
+def test_iterate_async():
+    ctx = Qit()
+    x = Variable(Int(), "x")
+
+    async def main():
+        result = []
+        async for item in ctx.iterate_async(Range(x), { "x": 5 }):
+            result.append(item)
+        return result
+
+    assert asyncio.run(main()) == [0, 1, 2, 3, 4]
+
+def test_run_async_cancel():
+    ctx = Qit()
+    f = Function().returns(Int()).code("while(true) {} return 0;")
+
+    async def main():
+        task = asyncio.ensure_future(ctx.run_async(f()))
+        await asyncio.sleep(2)
+        task.cancel()
+        with pytest.raises(asyncio.CancelledError):
+            await task
+
+    asyncio.run(main())
@@ -0,0 +1,66 @@
+from testutils import Qit, init, get_filename_in_build_dir, BUILD_DIR, SRC_DIR
+init()
+
+from qit import Range, Variable, Int, register
+from qit.base import registry
+from qit.base.exception import QitException
+
+import json
+import os
+import pytest
+import shutil
+import subprocess
+import sys
+import tempfile
+
+def test_bundle():
+    ctx = Qit()
+    x = Variable(Int(), "x")
+    queries = [ (Range(3).iterate(), None),
+                (Range(x).iterate(), None),
+                (Range(x).iterate(), { "x": 2 }) ]
+    directory = get_filename_in_build_dir("bundle")
+    bundle = ctx.build_bundle(directory, queries, jobs=2)
+    assert len(bundle.programs) == 3
+
+    # Bundle is relocatable (build directory is cleaned by Qit())
+    moved = os.path.join(tempfile.mkdtemp(), "bundle")
+    shutil.move(directory, moved)
+
+    ctx = Qit(bundle=moved)
+    assert ctx.run(Range(3).iterate()) == [0, 1, 2]
+    assert ctx.run(Range(x).iterate(), { "x": 2 }) == [0, 1]
+    assert ctx.prepare(Range(x).iterate()).run(x=4) == [0, 1, 2, 3]
+    # Nothing was compiled
+    assert ctx.env.cache.entries() == []
+    shutil.rmtree(os.path.dirname(moved))
+
+def test_bundle_cli():
+    ctx = Qit()
+    with open(get_filename_in_build_dir("qit_queries.py"), "w") as f:
+        f.write("from qit import Range, register\n"
+                "register(Range(5).iterate())\n")
+    env = dict(os.environ, PYTHONPATH=SRC_DIR)
+    subprocess.check_call(
+        (sys.executable, "-m", "qit", "build", "qit_queries",
+         "-o", "bundle", "--build-dir", "tmp-build"),
+        cwd=BUILD_DIR, env=env, stdout=subprocess.DEVNULL)
+    moved = os.path.join(tempfile.mkdtemp(), "bundle")
+    shutil.move(get_filename_in_build_dir("bundle"), moved)
+    # Programs are built for a portable target, which is used also by
+    # contexts that load the bundle
+    with open(os.path.join(moved, "index.json")) as f:
+        assert json.load(f)["march"] == "x86-64"
+    ctx = Qit(bundle=moved)
+    assert ctx.env.march == "x86-64"
+    assert ctx.run(Range(5).iterate()) == [0, 1, 2, 3, 4]
+    assert ctx.env.cache.entries() == []
+    with pytest.raises(QitException):
+        Qit(bundle=moved, march="native")
+    shutil.rmtree(os.path.dirname(moved))
+
+def test_register():
+    obj = Range(2).iterate()
+    assert register(obj) is obj
+    assert (obj, None) in registry.get_registered_queries()
+    registry.QUERIES.remove((obj, None))
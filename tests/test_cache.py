@@ -0,0 +1,81 @@
+from testutils import Qit, init, make_file_in_build_dir
+init()
+
+from qit import Range, Function, Int
+import os
+
+def test_cache_hit():
+    ctx = Qit()
+    expr = Range(10).iterate()
+    assert list(range(10)) == ctx.run(expr)
+    entries = ctx.env.cache.entries()
+    assert len(entries) == 1
+    inode = os.stat(entries[0][2]).st_ino
+
+    assert list(range(10)) == ctx.run(expr)
+    entries = ctx.env.cache.entries()
+    assert len(entries) == 1
+    assert inode == os.stat(entries[0][2]).st_ino
+
+def test_cache_different_queries():
+    ctx = Qit()
+    assert list(range(10)) == ctx.run(Range(10).iterate())
+    assert list(range(5)) == ctx.run(Range(5).iterate())
+    assert len(ctx.env.cache.entries()) == 2
+
+def test_cache_external_file_changed():
+    ctx = Qit()
+    f = Function("f").takes(Int(), "x").returns(Int()).from_file("f.hxx")
+    expr = Range(3).iterate().map(f)
+
+    make_file_in_build_dir("f.hxx", "qint f(qint x) { return x * 10; }")
+    assert [0, 10, 20] == ctx.run(expr)
+    make_file_in_build_dir("f.hxx", "qint f(qint x) { return x + 10; }")
+    assert [10, 11, 12] == ctx.run(expr)
+    assert len(ctx.env.cache.entries()) == 2
+
+def test_cache_eviction():
+    ctx = Qit(cache_size=0)
+    assert list(range(10)) == ctx.run(Range(10).iterate())
+    entries = ctx.env.cache.entries()
+    assert len(entries) == 1
+    assert list(range(5)) == ctx.run(Range(5).iterate())
+    new_entries = ctx.env.cache.entries()
+    assert len(new_entries) == 1
+    assert entries[0][2] != new_entries[0][2]
+
+def test_cache_lru():
+    ctx = Qit()
+    ctx.run(Range(1).iterate())
+    ctx.run(Range(2).iterate())
+    ctx.run(Range(3).iterate())
+    entries = sorted(ctx.env.cache.entries())
+    first = entries[0][2]
+    for mtime, size, path in entries:
+        os.utime(path, (mtime - 100, mtime - 100))
+    os.utime(first, None)  # The oldest entry is used again
+    ctx.env.cache.size_limit = 2 * entries[0][1]
+    ctx.env.cache.evict()
+    paths = [path for mtime, size, path in ctx.env.cache.entries()]
+    assert len(paths) == 2
+    assert first in paths
+
+def test_no_sources_left():
+    ctx = Qit(debug=False)
+    ctx.run(Range(1).iterate())
+    assert not [f for f in os.listdir(ctx.env.build_dir) if f.endswith(".cpp")]
+
+def test_cache_pinned():
+    ctx = Qit()
+    ctx.run(Range(1).iterate())
+    ctx.run(Range(2).iterate())
+    cache = ctx.env.cache
+    path = sorted(cache.entries())[0][2]
+    key = os.path.basename(path)
+    assert cache.get(key, pin=True) == path
+    cache.size_limit = 0
+    cache.evict()
+    assert [p for mtime, size, p in cache.entries()] == [path]
+    cache.unpin([path])
+    cache.evict()
+    assert cache.entries() == []
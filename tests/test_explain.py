@@ -0,0 +1,60 @@
+from testutils import Qit, init
+init()
+
+from qit import Range, Product, Sequence, System, Variable, Function
+from qit import Int, Bool, Domain
+
+import io
+
+def test_explain_sizes():
+    ctx = Qit()
+    x = Variable(Int(), "x")
+    p = Product(Range(10), Sequence(Range(3), x))
+    out = io.StringIO()
+    text = ctx.explain(p.iterate().sort().take(5), { "x": 2 }, file=out)
+    assert out.getvalue() == text + "\n"
+    lines = text.split("\n")
+    assert lines[:6] == [ "to_vector (materialized)",
+                          "  Take size 5",
+                          "    Sort size 90 (materialized)",
+                          "      Product size 90",
+                          "        Range size 10, reset 9 times",
+                          "        Sequence size 9" ]
+    assert lines[7].startswith("Generated code: ")
+    assert "Warning" not in text
+
+    text = ctx.explain(p, file=out)
+    assert "Product size ?" in text
+    assert "Warning: Size of the result is unknown" in text
+
+def test_explain_warnings():
+    ctx = Qit()
+    f = Function().takes(Int(), "a").returns(Int()).code("return a + 1;")
+    g = Function().takes(Int(), "a").returns(Bool()).code("return a > 5;")
+    s = System(Range(1), (f,))
+    p = Product((s.states(10), "s"), (Range(100), "r"))
+    text = ctx.explain(p.iterate(), file=io.StringIO())
+    assert "State size ?, reset 100 times (materialized)" in text
+    assert "Warning: State is recomputed by each of 100 resets" in text
+
+    p = Product((Range(10 ** 5), "x"), (Range(10 ** 5), "y"))
+    text = ctx.explain(p.iterate(), file=io.StringIO())
+    assert "Warning: Result has about 10000000000 elements" in text
+    text = ctx.explain(p.iterate().filter(g), file=io.StringIO())
+    assert "Filter size <=10000000000" in text
+    text = ctx.explain(p.iterate().filter(x=g), file=io.StringIO())
+    assert "Cache size <=100000, reset 100000 times (materialized)" in text
+
+def test_explain_subclasses():
+    from qit.domains.transformation import FilterTransformation
+
+    class Keep(FilterTransformation):
+        pass
+
+    ctx = Qit()
+    g = Function().takes(Int(), "a").returns(Bool()).code("return a > 5;")
+    d = Domain(Int(), Keep(Range(10).iterate(), g))
+    p = Product((d, "x"), (Range(3), "y"))
+    text = ctx.explain(p.iterate(), file=io.StringIO())
+    assert "  Keep size <=10, reset 3 times" in text
+    assert "Warning: Filter is evaluated again by each of 3 resets" in text
@@ -3,6 +3,7 @@ from testutils import Qit, init
 init()
 
 from qit import Range, Function, Bool, Int, Product, Variable
+from qit.base.exception import QitException
 
 
 def test_filter_empty():
@@ -47,3 +48,46 @@ def test_filter_free_variables():
     f = Function().takes(Int(), "a").returns(Bool()).reads(x).code("return a != x;")
     result = ctx.run(Range(5).iterate().filter(f), args={"x" : 3})
     assert result == [0, 1, 2, 4]
+
+def test_filter_fields():
+    ctx = Qit()
+    p = Product((Range(6), "x"), (Range(5), "y"), (Range(4), "z"))
+    even = Function().takes(Int(), "a").returns(Bool()).code("return a % 2 == 0;")
+    small = Function().takes(Int(), "a").returns(Bool()).code("return a < 2;")
+    f = Function().takes(p.type, "p").returns(Bool()).code("return p.x != p.y;")
+    g = Function().takes(p.type, "p").returns(Bool()).code(
+        "return p.x % 2 == 0 && p.z < 2 && p.x != p.y;")
+
+    expected = ctx.run(p.iterate().filter(g))
+    assert len(expected) == 3 * 5 * 2 - 3 * 2
+    assert ctx.run(p.iterate().filter(x=even, z=small, _all=f)) == expected
+    assert ctx.run(p.iterate().filter(f, x=even, z=small)) == expected
+    # Filters of fields are applied on components of the product
+    it = p.iterate().filter(x=even, z=small)
+    assert [ i.__class__.__name__ for i in it.iterators ] == \
+        [ "CacheTransformation", "RangeIterator", "FilterTransformation" ]
+
+def test_filter_fields_large_product():
+    ctx = Qit()
+    n = 1000000
+    p = Product((Range(n), "x"), (Range(n), "y"))
+    x = Function().takes(Int(), "a").returns(Bool()).code("return a % 250000 == 1;")
+    y = Function().takes(Int(), "a").returns(Bool()).code("return a == 7;")
+    assert ctx.run(p.iterate().filter(x=x, y=y)) == \
+        [ (1, 7), (250001, 7), (500001, 7), (750001, 7) ]
+
+def test_filter_fields_errors():
+    f = Function().takes(Int(), "a").returns(Bool()).code("return true;")
+    p = Product((Range(2), "x"), (Range(2), "y"))
+    with pytest.raises(QitException):
+        p.iterate().filter(z=f)
+    with pytest.raises(QitException):
+        Range(3).iterate().filter(x=f)
+    with pytest.raises(QitException):
+        p.iterate().filter()
+
+def test_filter_fields_of_struct():
+    from qit import Values
+    f = Function().takes(Int(), "a").returns(Bool()).code("return a > 1;")
+    v = Values(Int() * Int(), ((1, 2), (2, 3), (3, 0)))
+    assert Qit().run(v.iterate().filter(v0=f, v1=f)) == [(2, 3)]
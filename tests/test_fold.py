@@ -0,0 +1,75 @@
+from testutils import Qit, init
+init()
+
+from qit import Range, Product, Sequence, Variable, Int, Function, Domain
+from qit.base.exception import NotConstant, QitException
+
+import pytest
+
+def test_fold_constant_sizes():
+    assert Range(2, 11, 3).size.is_constructor()
+    assert Range(2, 11, 3).size_value() == 3
+    assert Range(10, 0, -3).size_value() == 3
+    p = Product(Range(3), Range(4), Sequence(Range(2), 3))
+    assert p.size.is_constructor()
+    assert p.size_value() == 3 * 4 * 8
+
+def test_size_value_with_variables():
+    x = Variable(Int(), "x")
+    y = Variable(Int(), "y")
+    p = Product(Range(x), Sequence(Range(3), y))
+    assert not p.size.is_constructor()
+    assert p.size_value({ "x": 2, "y": 4 }) == 2 * 81
+    with pytest.raises(NotConstant):
+        p.size_value({ "x": 2 })
+
+    ctx = Qit()
+    for args in ({ "x": 2, "y": 4 }, { "x": 3, "y": 0 }, { "x": 1, "y": 7 }):
+        assert ctx.run(p.size, args) == p.size_value(args)
+
+def test_fold_functions():
+    f = Function().takes(Int(), "a").returns(Int()).code("return a * 2;")
+    assert not f(3).is_constructor()
+    with pytest.raises(NotConstant):
+        f(3).evaluate()
+
+    f.evaluates(lambda a: a * 2)
+    assert f(3).is_constructor()
+    assert f(3).evaluate() == 6
+    assert Qit().run(f(f(3))) == 12
+
+    g = Function().takes(Int(), "a").returns(Int()).code("return a + rand();")
+    g.evaluates(lambda a: a, pure=False)
+    assert not g(3).is_constructor()
+
+def test_size_value_without_size():
+    with pytest.raises(QitException):
+        Domain(Int()).size_value()
+
+def test_fold_overflow():
+    from qit.functions.int import power
+    p = Product(Range(70000), Range(70000))
+    assert not p.size.is_constructor()
+    assert p.size_value() == 70000 * 70000
+    assert p.size_value() == p.iterate().estimate_size({})
+    assert Qit().run(p.size) == p.size.evaluate() == 70000 * 70000 - 2 ** 32
+    assert power(Int().value(3), Int().value(20)).evaluate() == \
+        3 ** 20 - 2 ** 32
+    assert Sequence(Range(3), 40).size_value() == 3 ** 40
+    x = Variable(Int(), "x")
+    expr = power(x, Int().value(40))
+    assert Qit().run(expr, { "x": 3 }) == expr.evaluate({ "x": 3 })
+
+def test_fold_power():
+    from qit.functions.int import power
+    x = Variable(Int(), "x")
+    expr = power(x, Int().value(16))
+    assert Qit().run(expr, { "x": 2 }) == expr.evaluate({ "x": 2 }) == 2 ** 16
+    assert power(Int().value(2), Int().value(16)).evaluate() == 2 ** 16
+
+def test_fold_error():
+    # Failing calls are not folded during construction of queries
+    r = Range(0, 10, 0)
+    assert not r.size.is_constructor()
+    with pytest.raises(NotConstant):
+        r.size_value()
@@ -62,3 +62,42 @@ def test_function_constant():
     f = Int().value(7).make_function()
     result = c.run(f())
     assert result == 7
+
+def test_function_template_cache():
+    from qit.build import builder
+    code = "return x * 3; /* template cache */"
+    f = Function().takes(Int(), "x").returns(Int()).code(code)
+    g = Function().takes(Int(), "x").returns(Int()).code(code)
+    ctx = Qit()
+    assert ctx.run(Range(3).iterate().map(f).map(g)) == [0, 9, 18]
+    template = builder.get_template(code)
+    hits = builder.get_template.cache_info().hits
+    assert ctx.run(Range(2).iterate().map(g)) == [0, 3]
+    assert builder.get_template(code) is template
+    assert builder.get_template.cache_info().hits > hits + 1
+    # Number of compiled templates is bounded
+    assert builder.get_template.cache_info().maxsize is not None
+
+def test_function_invariant_calls():
+    ctx = Qit()
+    counter = "static qint calls = 0; return ++calls;"
+    # Calls are not cached unless the function is marked
+    f = Function().returns(Int()).code(counter)
+    g = Function().takes(Int(), "a").returns(Int())
+    g.code("return a + {{f}};", f=f())
+    assert ctx.run(Range(5).iterate().map(g)) == [1, 3, 5, 7, 9]
+
+    # f() does not depend on 'a', so it is evaluated once
+    f = Function().returns(Int()).code(counter).deterministic()
+    g = Function().takes(Int(), "a").returns(Int())
+    g.code("return a + {{f}};", f=f())
+    assert ctx.run(Range(5).iterate().map(g)) == [1, 2, 3, 4, 5]
+
+    # Functions with a pure Python counterpart are cached as well
+    x = Variable(Int(), "x")
+    f = Function().takes(Int(), "b").returns(Int())
+    f.code("static qint calls = 0; return b + ++calls;")
+    f.evaluates(lambda b: b + 1)
+    g = Function().takes(Int(), "a").returns(Int())
+    g.code("return a + {{f}};", f=f(x))
+    assert ctx.run(Range(3).iterate().map(g), {"x": 10}) == [11, 12, 13]
@@ -0,0 +1,32 @@
+from testutils import init, SRC_DIR
+init()
+
+import os
+import subprocess
+import sys
+
+import qit
+
+def run_python(code):
+    env = dict(os.environ, PYTHONPATH=SRC_DIR)
+    return subprocess.check_output((sys.executable, "-c", code), env=env,
+                                   universal_newlines=True).strip()
+
+def test_lazy_imports():
+    assert run_python(
+        "import sys, qit\n"
+        "from qit import Range, Product, Qit\n"
+        "(Range(3) * Range(2)).iterate().take(2)\n"
+        "print('jinja2' in sys.modules, 'qit.build.env' in sys.modules)"
+        ) == "False False"
+
+def test_exports():
+    from qit.domains.range import Range
+    assert qit.Range is Range
+    assert "Range" in dir(qit)
+    assert set(qit.__all__) <= set(dir(qit))
+    try:
+        qit.NoSuchName
+        assert False
+    except AttributeError:
+        pass
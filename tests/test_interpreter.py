@@ -0,0 +1,81 @@
+from testutils import Qit, init
+init()
+
+from qit import Range, Product, Sequence, Values, Enumerate, Variable
+from qit import Int, Bool, Function, Vector
+from qit.build.interpreter import Interpreter
+from qit.base.exception import NotConstant, QitException
+
+import pytest
+
+def check(ctx, obj, args=None):
+    expected = ctx.run(obj, args)
+    assert Interpreter().run(obj, args) == expected
+    return expected
+
+def test_interpreter_domains():
+    ctx = Qit()
+    assert check(ctx, Range(2, 11, 3).iterate()) == [2, 5, 8]
+    check(ctx, Values(Int() * Int(), ((1, 2), (3, 4))).iterate())
+    check(ctx, Values(Vector(Int()), ([1, 2], [], [3])).iterate())
+    check(ctx, Enumerate("A", "B", "C").iterate())
+    check(ctx, Product(Range(3), Enumerate("X", "Y"), Range(2)).iterate())
+    check(ctx, Sequence(Range(3), 3).iterate())
+
+def test_interpreter_transformations():
+    ctx = Qit()
+    p = Product(Range(4), Range(3))
+    f = Function().takes(p.type, "p").returns(Int())
+    f.code("return p.v0 * p.v1;").evaluates(lambda p: p[0] * p[1])
+    g = Function().takes(Int(), "a").returns(Bool())
+    g.code("return a % 2 == 0;").evaluates(lambda a: a % 2 == 0)
+
+    check(ctx, p.iterate().take(5))
+    check(ctx, p.iterate().take(0))
+    check(ctx, p.iterate().map(f).sort())
+    check(ctx, p.iterate().map(f).filter(g).take(4))
+    check(ctx, Values(Int() * Int(), ((3, 1), (1, 2), (1, 1))).iterate().sort())
+    check(ctx, Enumerate("B", "A").iterate().sort())
+
+def test_interpreter_variables():
+    ctx = Qit()
+    x = Variable(Int(), "x")
+    check(ctx, Range(x).iterate(), { "x": 4 })
+    check(ctx, Sequence(Range(2), x).iterate(), { "x": 3 })
+    f = Function().takes(Int(), "a").returns(Int())
+    f.code("return a + 1;").evaluates(lambda a: a + 1)
+    check(ctx, f(x), { "x": 10 })
+
+def test_interpreter_fallback():
+    f = Function().takes(Int(), "a").returns(Int()).code("return a + 1;")
+    with pytest.raises(NotConstant):
+        Interpreter().run(Range(3).iterate().map(f))
+    with pytest.raises(NotConstant):
+        Interpreter().run(Range(3).generate())
+
+    ctx = Qit(backend="python")
+    assert ctx.run(Range(3).iterate().map(f)) == [1, 2, 3]
+    assert ctx.run(Range(3).iterate()) == [0, 1, 2]
+
+def test_interpreter_limit():
+    p = Product(Range(100), Range(100))
+    with pytest.raises(NotConstant):
+        Interpreter(limit=1000).run(p.iterate())
+    assert len(Interpreter(limit=1000).run(p.iterate().take(10))) == 10
+
+    ctx = Qit(backend="auto", python_limit=1000)
+    assert len(ctx.run(p.iterate())) == 10000
+    assert ctx.run(p.iterate().take(2)) == [(0, 0), (1, 0)]
+
+    # Filters may go through the whole source before a few elements are taken
+    g = Function().takes(p.type, "p").returns(Bool())
+    g.code("return p.v0 == 99 && p.v1 == 99;")
+    g.evaluates(lambda p: p == (99, 99))
+    q = p.iterate().filter(g).take(5)
+    assert q.estimate_size({}) == 10000
+    with pytest.raises(NotConstant):
+        Interpreter(limit=1000).run(q)
+    assert ctx.run(q) == [(99, 99)]
+
+    with pytest.raises(QitException):
+        Qit(backend="java")
@@ -0,0 +1,49 @@
+from testutils import Qit, init
+init()
+
+from qit import Range, Variable, Int, Product, Map, Function, Struct
+from qit.base.exception import QitException
+import pytest
+
+def test_library_run():
+    ctx = Qit(execution="library")
+    assert ctx.run(Range(5).iterate()) == [0, 1, 2, 3, 4]
+    p = Product((Range(2), "x"), (Range(2), "y"))
+    assert set(ctx.run(p.iterate())) == set([(0, 0), (0, 1), (1, 0), (1, 1)])
+
+def test_library_cached():
+    ctx = Qit(execution="library")
+    expr = Range(3).iterate()
+    assert ctx.run(expr) == [0, 1, 2]
+    assert ctx.run(expr) == [0, 1, 2]
+    assert len(ctx.env.cache.entries()) == 1
+    assert len(ctx.env.libraries) == 1
+
+def test_library_prepared():
+    ctx = Qit(execution="library")
+    x = Variable(Int(), "x")
+    m = Variable(Map(Int(), Int()), "m")
+    f = Function().takes(Int(), "a").returns(Int()).reads(m)
+    f.code("auto it = m.find(a); return it == m.end() ? -1 : it->second;")
+    q = ctx.prepare(Range(x).iterate().map(f))
+    assert q.run(x=3, m={1: 10}) == [-1, 10, -1]
+    assert q.run(x=2, m={0: 7, 1: 8}) == [7, 8]
+
+def test_library_and_process_differ():
+    ctx = Qit(execution="library")
+    ctx.run(Range(3).iterate())
+    ctx.env.execution = "process"
+    ctx.run(Range(3).iterate())
+    assert len(ctx.env.cache.entries()) == 2
+
+def test_library_symbols_not_shared():
+    # Libraries declare the same names; each one has to use its own symbols
+    ctx = Qit(execution="library")
+    s = Struct(Int(), Int())
+    assert ctx.run(s.values((1, 2), (3, 4)).iterate()) == [(1, 2), (3, 4)]
+    assert ctx.run(s.values((5, 6), (7, 8), (9, 10)).iterate()) == \
+        [(5, 6), (7, 8), (9, 10)]
+
+def test_invalid_execution():
+    with pytest.raises(QitException):
+        Qit(execution="xxx")
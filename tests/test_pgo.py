@@ -0,0 +1,54 @@
+from testutils import Qit, init
+init()
+
+from qit import Range, Variable, Int, Product
+from qit.base.exception import QitException
+import os
+import pytest
+
+def test_pgo_run():
+    ctx = Qit()
+    x = Variable(Int(), "x")
+    expr = Product(Range(x), Range(x)).iterate().take(5)
+    result = ctx.run(expr, {"x": 100}, pgo=True, training_args={"x": 10})
+    assert result == [(0, 0), (1, 0), (2, 0), (3, 0), (4, 0)]
+
+    pgo_dir = os.path.join(ctx.env.build_dir, "pgo")
+    profiles = os.listdir(pgo_dir)
+    assert len(profiles) == 1
+    assert os.path.isfile(os.path.join(pgo_dir, profiles[0], "program.gcda"))
+
+    assert len(ctx.env.cache.entries()) == 1
+    result = ctx.run(expr, {"x": 3}, pgo=True, training_args={"x": 10})
+    assert result == [(0, 0), (1, 0), (2, 0), (0, 1), (1, 1)]
+    assert len(ctx.env.cache.entries()) == 1
+
+def test_pgo_prepared():
+    ctx = Qit(pgo=True, execution="library")
+    x = Variable(Int(), "x")
+    q = ctx.prepare(Range(x).iterate(), training_args={"x": 5})
+    assert q.run(x=3) == [0, 1, 2]
+    assert q.run(x=4) == [0, 1, 2, 3]
+    assert len(ctx.env.cache.entries()) == 1
+
+def test_pgo_evicted_program_reuses_profile():
+    ctx = Qit(pgo=True)
+    x = Variable(Int(), "x")
+    q = ctx.prepare(Range(x).iterate(), training_args={"x": 10})
+    ctx.env.cache.clear()
+    assert q.run(x=2) == [0, 1]
+
+def test_pgo_requires_training_args():
+    ctx = Qit(pgo=True)
+    x = Variable(Int(), "x")
+    with pytest.raises(QitException):
+        ctx.prepare(Range(x).iterate())
+    assert ctx.run(Range(3).iterate()) == [0, 1, 2]
+
+def test_pgo_eviction():
+    ctx = Qit(cache_size=0)
+    x = Variable(Int(), "x")
+    ctx.run(Range(x).iterate(), {"x": 2}, pgo=True, training_args={"x": 10})
+    ctx.run(Range(x).iterate().take(1), {"x": 2},
+            pgo=True, training_args={"x": 10})
+    assert len(ctx.env.pgo_cache.entries()) == 1
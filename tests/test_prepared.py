@@ -0,0 +1,52 @@
+from testutils import Qit, init
+init()
+
+from qit import Range, Variable, Int, Bool, Vector, Set, Map, Struct, Enum
+from qit import Function, Product
+from qit.base.exception import QitException
+import pytest
+
+def test_prepared_range():
+    ctx = Qit()
+    x = Variable(Int(), "x")
+    q = ctx.prepare(Range(x).iterate())
+    assert q.run(x=3) == [0, 1, 2]
+    assert q.run({"x": 5}) == [0, 1, 2, 3, 4]
+    assert q.run(x=0) == []
+    assert len(ctx.env.cache.entries()) == 1
+
+def test_prepared_types():
+    ctx = Qit()
+    s = Struct((Int(), "a"), (Bool(), "b"), (Enum("A", "B", "C"), "c"))
+    t = Map(Int(), Set(Int() * Int()))
+    x = Variable(s, "x")
+    y = Variable(t, "y")
+    q = ctx.prepare(Product((s.values(x), "x"),
+                            (t.values(y), "y")).iterate())
+    value_x = (-7, True, "C")
+    value_y = {1: {(1, 2), (3, 4)}, 2: set()}
+    assert q.run(x=value_x, y=value_y) == [(value_x, value_y)]
+    assert q.run(x=(3, False, "A"), y={}) == [((3, False, "A"), {})]
+
+def test_prepared_no_variables():
+    ctx = Qit()
+    q = ctx.prepare(Range(3).iterate())
+    assert q.run() == [0, 1, 2]
+
+def test_prepared_function_variable():
+    ctx = Qit()
+    x = Variable(Int(), "x")
+    f = Function().takes(Int(), "a").returns(Int()).reads(x)
+    f.code("return a * x;")
+    q = ctx.prepare(Range(4).iterate().map(f))
+    assert q.run(x=2) == [0, 2, 4, 6]
+    assert q.run(x=3) == [0, 3, 6, 9]
+
+def test_prepared_invalid_args():
+    ctx = Qit()
+    x = Variable(Int(), "x")
+    q = ctx.prepare(Range(x).iterate())
+    with pytest.raises(QitException):
+        q.run()
+    with pytest.raises(QitException):
+        q.run(x="abc")
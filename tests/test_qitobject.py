@@ -0,0 +1,35 @@
+from testutils import Qit, init
+init()
+
+from qit import Range, Function, Int, Variable
+
+def test_cache_invalidation():
+    x = Variable(Int(), "x")
+    f = Function().takes(Int(), "a").returns(Int()).code("return a;")
+    expr = Range(10).iterate().map(f)
+    h = hash(expr)
+    assert expr.get_variables() == frozenset()
+
+    # Change of a nested object is visible in the parent
+    f.code("return a + x;", x=x)
+    assert hash(expr) != h
+    assert expr.get_variables() == frozenset((x,))
+    assert f in expr.get_objects()
+
+def test_copy_cache():
+    f = Function().takes(Int(), "a").returns(Int()).code("return a;")
+    hash(f)
+    g = f.copy()
+    g.code("return a + 1;")
+    assert f != g
+    assert hash(f) != hash(g)
+    assert f.inline_code == "return a;"
+
+def test_shared_subgraphs():
+    f = Function().takes(Int(), "a").returns(Int()).code("return a + 1;")
+    g = Function().takes(Int(), "a").returns(Int()).code("return a % 100 != 0;")
+    it = Range(5).iterate()
+    for i in range(50):
+        it = it.map(f).filter(g)
+    result = Qit().run(it)
+    assert result == [ v + 50 for v in range(5) ]
@@ -0,0 +1,56 @@
+from testutils import Qit, init
+init()
+
+from qit import Range, Variable, Int, Function
+from qit.base.exception import BatchFailed, CompilationFailed, QitException
+import pytest
+import struct
+
+def test_run_many():
+    ctx = Qit()
+    x = Variable(Int(), "x")
+    items = [(Range(x).iterate(), {"x": i}) for i in range(5)]
+    items.append((Range(3).iterate().map(Function().takes(Int(), "a")
+                                                   .returns(Int())
+                                                   .code("return a * 2;")),
+                  None))
+    result = ctx.run_many(items, jobs=3)
+    expected = [list(range(i)) for i in range(5)]
+    expected.append([0, 2, 4])
+    assert result == expected
+
+def test_run_many_same_sources():
+    ctx = Qit()
+    expr = Range(4).iterate()
+    result = ctx.run_many([(expr, None)] * 4)
+    assert result == [[0, 1, 2, 3]] * 4
+    assert len(ctx.env.cache.entries()) == 1
+
+def test_run_many_errors():
+    ctx = Qit()
+    x = Variable(Int(), "x")
+    f = Function().takes(Int(), "a").returns(Int()).code("return a +;")
+    items = [(Range(2).iterate(), None),
+             (Range(2).iterate().map(f), None),
+             (Range(x).iterate(), None)]
+    with pytest.raises(BatchFailed) as e:
+        ctx.run_many(items)
+    assert e.value.results[0] == [0, 1]
+    assert set(e.value.errors) == set((1, 2))
+    assert isinstance(e.value.errors[1], CompilationFailed)
+    assert isinstance(e.value.errors[2], QitException)
+
+class WideInt(Int):
+    # Reads 8 bytes, the program writes only 4
+    struct = struct.Struct("<q")
+    struct_size = struct.size
+
+def test_run_many_read_errors():
+    ctx = Qit()
+    f = Function().returns(WideInt()).code("return 1;")
+    items = [(f(), None), (Range(2).iterate(), None)]
+    with pytest.raises(BatchFailed) as e:
+        ctx.run_many(items)
+    assert e.value.results[1] == [0, 1]
+    assert set(e.value.errors) == set((0,))
+    assert isinstance(e.value.errors[0], struct.error)
@@ -0,0 +1,26 @@
+from testutils import Qit, init
+init()
+
+from qit import Range, Product, Function, Int, Variable
+
+def test_run_multi():
+    ctx = Qit()
+    d = Range(Variable(Int(), "x"))
+    f = Function().takes(Int(), "v").returns(Int()).code("return v % 2 == 0;")
+    result = ctx.run_multi({ "a": d.iterate(),
+                             "b": d.iterate().filter(f),
+                             "c": (d * d).iterate().take(3),
+                             "size": d.size }, { "x": 5 })
+    assert result == { "a": [0, 1, 2, 3, 4],
+                       "b": [0, 2, 4],
+                       "c": [(0, 0), (1, 0), (2, 0)],
+                       "size": 5 }
+    # All expressions share one program
+    assert len(ctx.env.cache.entries()) == 1
+
+def test_run_multi_library():
+    ctx = Qit(execution="library")
+    result = ctx.run_multi({ "a": Range(3).iterate(),
+                             "b": Range(2).generate().take(2) })
+    assert result["a"] == [0, 1, 2]
+    assert len(result["b"]) == 2
@@ -0,0 +1,67 @@
+from testutils import Qit, init
+init()
+
+from qit import Range, Map, Int, Vector, Function
+from qit.build.builder import CppBuilder
+import os
+import shutil
+
+def build_source(ctx, obj):
+    builder = CppBuilder(ctx.env)
+    builder.build_collect(obj.get_expression(), {})
+    return builder.writer.get_string()
+
+def test_runtime_headers():
+    ctx = Qit()
+    text = build_source(ctx, Int().value(1))
+    assert "#include <map>" not in text
+    assert "#include <vector>" not in text
+
+    text = build_source(ctx, Map(Int(), Int()).value({1: 2}))
+    assert "#include <map>" in text
+    assert "#include <vector>" not in text
+
+    text = build_source(ctx, Range(10).iterate())
+    assert "#include <vector>" in text
+
+def test_function_includes():
+    ctx = Qit()
+    f = Function().returns(Int()).includes("sstream")
+    f.code("std::stringstream s; s << 12; qint x; s >> x; return x;")
+    assert "#include <sstream>" in build_source(ctx, f())
+    assert ctx.run(f()) == 12
+
+def test_precompiled_header():
+    ctx = Qit()
+    assert ctx.run(Range(3).iterate()) == [0, 1, 2]
+    pch_dir = os.path.join(ctx.env.build_dir, "pch")
+    filename = ctx.env.get_precompiled_header(
+        ctx.env.get_cpp_flags("process"))
+    assert filename is not None
+    assert os.path.isfile(filename + ".gch")
+    assert os.path.dirname(os.path.dirname(filename)) == pch_dir
+
+def test_precompiled_header_shared():
+    ctx = Qit()
+    assert ctx.run(Range(3).iterate()) == [0, 1, 2]
+    entries = ctx.env.pch_cache.entries()
+    # A program with other headers uses the same precompiled header
+    assert ctx.run(Range(3).iterate().sort()) == [0, 1, 2]
+    f = Function().returns(Int()).includes("sstream")
+    f.code("std::stringstream s; s << 12; qint x; s >> x; return x;")
+    assert ctx.run(f()) == 12
+    assert len(ctx.env.pch_cache.entries()) == len(entries)
+
+def test_precompiled_header_eviction():
+    ctx = Qit(cache_size=0)
+    assert ctx.run(Range(3).iterate()) == [0, 1, 2]
+    flags = ctx.env.get_cpp_flags("process") + ("-DQIT_TEST_PCH",)
+    # Header from a previous run is removed, so it is created again
+    shutil.rmtree(os.path.dirname(ctx.env.get_precompiled_header(flags)))
+    filename = ctx.env.get_precompiled_header(flags)
+    assert [path for mtime, size, path in ctx.env.pch_cache.entries()] == \
+        [os.path.dirname(filename)]
+
+def test_without_precompiled_header():
+    ctx = Qit(precompiled_header=False)
+    assert ctx.run(Range(3).iterate()) == [0, 1, 2]
@@ -0,0 +1,54 @@
+from testutils import Qit, init, make_file_in_build_dir
+init()
+
+from qit import Range, Function, Product, Int
+from qit.build.builder import CppBuilder
+
+def test_separate_compilation():
+    ctx = Qit(separate_compilation=True)
+    make_file_in_build_dir("f.hxx", "qint f(qint x) { return x * 10; }")
+    f = Function("f").takes(Int(), "x").returns(Int()).from_file("f.hxx")
+
+    assert ctx.run(Range(3).iterate().map(f)) == [0, 10, 20]
+    # Program + object files of the query and of the source
+    assert len(ctx.env.cache.entries()) == 3
+
+    # Object file is reused by another query
+    assert ctx.run(Range(4).iterate().map(f)) == [0, 10, 20, 30]
+    assert len(ctx.env.cache.entries()) == 5
+
+    # Change of source file rebuilds only its object file and the program
+    make_file_in_build_dir("f.hxx", "qint f(qint x) { return x + 1; }")
+    assert ctx.run(Range(3).iterate().map(f)) == [1, 2, 3]
+    assert len(ctx.env.cache.entries()) == 7
+
+def test_separate_compilation_struct():
+    ctx = Qit(separate_compilation=True, execution="library")
+    p = Product((Range(2), "x"), (Range(2), "y"))
+    g = Function("g").takes(p.type, "p").returns(Int()).from_file("g.hxx")
+    query = p.iterate().map(g)
+    # Name of the struct as it is declared in the program
+    builder = CppBuilder(ctx.env)
+    builder.build_collect(query.get_expression(), {})
+    name = p.type.build(builder)
+    make_file_in_build_dir(
+        "g.hxx", "qint g(const %s &p) { return p.x + 10 * p.y; }" % name)
+    assert sorted(ctx.run(query)) == [0, 1, 10, 11]
+
+def test_separate_compilation_struct_shared():
+    ctx = Qit(separate_compilation=True)
+    p = Product((Range(2), "x"), (Range(2), "y"))
+    g = Function("g").takes(p.type, "p").returns(Int()).from_file("g.hxx")
+    # Name of a struct depends only on its declaration
+    name = p.type.build(CppBuilder(ctx.env))
+    make_file_in_build_dir(
+        "g.hxx", "qint g(const %s &p) { return p.x + 10 * p.y; }" % name)
+    assert sorted(ctx.run(p.iterate().map(g))) == [0, 1, 10, 11]
+    assert len(ctx.env.cache.entries()) == 3
+
+    # Another struct is declared first, the object of g.hxx is reused
+    q = Product((Product(Range(1), Range(1)), "u"), (p, "w"))
+    h = Function().takes(q.type, "v").returns(Int())
+    h.code("return {{g}}(v.w);", g=g)
+    assert sorted(ctx.run(q.iterate().map(h))) == [0, 1, 10, 11]
+    assert len(ctx.env.cache.entries()) == 5
@@ -0,0 +1,42 @@
+from testutils import Qit, init
+init()
+
+from qit import Range, Variable, Int, Vector, Product
+from qit.base.exception import QitException
+
+import pytest
+
+def test_sweep():
+    ctx = Qit()
+    n = Variable(Int(), "n")
+    m = Variable(Int(), "m")
+    expr = Product((Range(n), "x"), (Range(m), "y")).iterate()
+    bindings = [ { "n": i, "m": j } for i in range(4) for j in range(3) ]
+    assert ctx.sweep(expr, bindings) == [ ctx.run(expr, b) for b in bindings ]
+
+def test_sweep_library():
+    ctx = Qit(execution="library")
+    v = Variable(Vector(Int()), "v")
+    assert ctx.sweep(v, [ { "v": [1, 2] }, { "v": [] } ]) == [[1, 2], []]
+    assert ctx.sweep(v, []) == []
+
+def test_sweep_many_bindings():
+    ctx = Qit()
+    n = Variable(Int(), "n")
+    result = ctx.sweep(Range(n).size, [ { "n": i } for i in range(50000) ])
+    assert result == list(range(50000))
+
+def test_sweep_unbound():
+    ctx = Qit()
+    n = Variable(Int(), "n")
+    with pytest.raises(QitException):
+        ctx.sweep(Range(n).iterate(), [ { "n": 1 }, {} ])
+
+def test_sweep_variable_names():
+    # Variables may have the same names as locals of the generated loop
+    ctx = Qit()
+    size = Variable(Int(), "size")
+    count = Variable(Int(), "count")
+    it = Product(Range(size), Range(count)).iterate()
+    results = ctx.sweep(it, [{"size": 2, "count": 1}, {"size": 1, "count": 2}])
+    assert results == [[(0, 0), (1, 0)], [(0, 0), (0, 1)]]
@@ -0,0 +1,63 @@
+from testutils import Qit, init
+init()
+
+from qit import Range, Product, Variable, Int, Function
+
+from concurrent.futures import ThreadPoolExecutor
+from unittest import mock
+import asyncio
+import subprocess
+import time
+
+def test_concurrent_runs():
+    ctx = Qit(max_compiles=2, max_runs=3)
+    x = Variable(Int(), "x")
+    expr = (Range(x) * Range(2)).iterate()
+
+    compilations = []
+    run = subprocess.run
+    def counting_run(args, *a, **kw):
+        if "-c" not in args and "c++-header" not in args:
+            compilations.append(args)
+        return run(args, *a, **kw)
+
+    with mock.patch("subprocess.run", counting_run):
+        with ThreadPoolExecutor(8) as pool:
+            results = list(pool.map(
+                lambda i: ctx.run(expr, { "x": i % 2 + 1 }), range(16)))
+
+    # Two distinct programs, each compiled once
+    assert len(compilations) == 2
+    for i, result in enumerate(results):
+        assert len(result) == (i % 2 + 1) * 2
+
+def test_concurrent_library_runs():
+    ctx = Qit(execution="library")
+    x = Variable(Int(), "x")
+    query = ctx.prepare(Range(x).generate().take(5))
+    with ThreadPoolExecutor(8) as pool:
+        results = list(pool.map(lambda i: query.run(x=i + 1), range(32)))
+    for i, result in enumerate(results):
+        assert len(result) == 5
+        assert all(0 <= v <= i for v in result)
+
+def test_run_slots_async_and_streams():
+    ctx = Qit(max_runs=1)
+    f = Function().returns(Int()).code("usleep(300000); return 1;")
+    f.includes("unistd.h")
+
+    async def main():
+        return await asyncio.gather(*(ctx.run_async(f()) for i in range(3)))
+
+    ctx.run(f())
+    start = time.time()
+    assert asyncio.run(main()) == [1, 1, 1]
+    assert time.time() - start >= 0.9
+
+    # Stream holds its slot until it is closed
+    it = ctx.iterate(Range(10).generate())
+    next(it)
+    assert not ctx.env.run_slots.acquire(blocking=False)
+    it.close()
+    assert ctx.env.run_slots.acquire(blocking=False)
+    ctx.env.run_slots.release()
@@ -0,0 +1,53 @@
+from testutils import Qit, init
+init()
+
+from qit import Range, Variable, Int, Function
+
+def test_tiered_promotion_by_runs():
+    ctx = Qit(tiered=True, tier_runs=2, tier_threshold=100)
+    expr = Range(5).iterate()
+    assert ctx.run(expr) == list(range(5))
+    stats = list(ctx.tier_stats().values())
+    assert len(stats) == 1
+    assert stats[0].tier == "quick"
+    assert stats[0].runs == 1
+    assert "quick" in stats[0].compile_times
+
+    assert ctx.run(expr) == list(range(5))
+    ctx.wait_for_tiers()
+    info = list(ctx.tier_stats().values())[0]
+    assert info.tier == "optimized"
+    assert info.promotion == "executed 2 times"
+    assert "optimized" in info.compile_times
+
+    assert ctx.run(expr) == list(range(5))
+    info = list(ctx.tier_stats().values())[0]
+    assert info.runs == 3
+    assert len(ctx.env.cache.entries()) == 2
+
+def test_tiered_promotion_by_time():
+    ctx = Qit(tiered=True, tier_runs=100, tier_threshold=0)
+    x = Variable(Int(), "x")
+    q = ctx.prepare(Range(x).iterate())
+    assert q.run(x=3) == [0, 1, 2]
+    ctx.wait_for_tiers()
+    info = list(ctx.tier_stats().values())[0]
+    assert info.tier == "optimized"
+    assert info.promotion.startswith("run took")
+    assert q.run(x=4) == [0, 1, 2, 3]
+
+def test_not_tiered():
+    ctx = Qit()
+    assert ctx.run(Range(2).iterate()) == [0, 1]
+    assert ctx.tier_stats() == {}
+
+def test_tiered_builders_released():
+    ctx = Qit(tiered=True, tier_runs=2, tier_threshold=100)
+    expr = Range(5).iterate()
+    assert ctx.run(expr) == list(range(5))
+    assert len(ctx.env.tiers.builders) == 1
+    assert ctx.run(expr) == list(range(5))
+    ctx.wait_for_tiers()
+    assert ctx.env.tiers.builders == {}
+    assert ctx.run(expr) == list(range(5))
+    assert ctx.env.tiers.builders == {}
@@ -1,7 +1,7 @@
 from testutils import Qit, init
 init()
 
-from qit import Range, Product, Function, Sequence, Variable, Int
+from qit import Range, Product, Function, Sequence, Variable, Int, Bool
 
 def test_take_too_much():
     expr = Range(10).iterate().take(20)
@@ -32,3 +32,35 @@ def test_sort():
     check(results)
     results = Qit().run(Range(5).generate().take(1000).sort())
     check(results)
+
+def test_fused_pipeline():
+    ctx = Qit()
+    f = Function().takes(Int(), "a").returns(Int())
+    f.code("return a * 3;").evaluates(lambda a: a * 3)
+    g = Function().takes(Int(), "a").returns(Bool())
+    g.code("return a % 2 == 1;").evaluates(lambda a: a % 2 == 1)
+    r = Range(20).iterate()
+    for it in (r.map(f).filter(g).map(f).take(4),
+               r.take(7).filter(g).take(2),
+               r.filter(g).take(0),
+               r.take(3).map(f).take(10).filter(g)):
+        expected = list(it.iterate_python({}))
+        assert ctx.run(it) == expected
+        assert list(ctx.iterate(it)) == expected
+
+def test_fused_pipeline_take_does_not_advance():
+    # Source is not moved forward after the last taken element
+    ctx = Qit()
+    it = Range(10).iterate()
+    it.next_fn = Function().takes(Int(), "iter", const=False).code(
+        "assert(iter < 2); iter++;")
+    assert ctx.run(it.take(3)) == [0, 1, 2]
+
+def test_replaced_next_fn():
+    # Native advance_fn of Range is not used with a replaced next_fn
+    ctx = Qit()
+    it = Range(10).iterate()
+    it.next_fn = Function().takes(Int(), "iter", const=False).code(
+        "iter += 3;")
+    assert ctx.run(it) == [0, 3, 6, 9]
+    assert ctx.run(it.take(2)) == [0, 3]
@@ -0,0 +1,57 @@
+from testutils import Qit, init, make_file_in_build_dir
+init()
+
+from qit import Range, Product, Sequence, Function, Variable, Int
+
+def make_query(modulo=3):
+    x = Variable(Int(), "x")
+    p = Product((Range(x), "a"), (Sequence(Range(3), 2), "b"))
+    f = Function().takes(p.type, "p").returns(Int()).code(
+            "return p.a + p.b[0] * 10 + p.b[1] * 100;")
+    g = Function().takes(Int(), "v").returns(Int()).code("return v * 2;")
+    return p.iterate().map(f).map(g).filter(
+            Function().takes(Int(), "v").returns(Int()).code(
+                "return v % {} != 0;".format(modulo))), {"x": 2}
+
+def test_translation_units():
+    expr, args = make_query()
+    expected = Qit().run(expr, args)
+    ctx = Qit(translation_units=3)
+    assert ctx.run(expr, args) == expected
+    # Program and objects of units
+    assert len(ctx.env.cache.entries()) > 2
+
+    expr, args = make_query()
+    ctx = Qit(translation_units=3, execution="library")
+    assert ctx.run(expr, args) == expected
+
+def test_translation_units_external():
+    ctx = Qit(translation_units=4)
+    make_file_in_build_dir("fg.hxx",
+                           "qint f(qint x) { return x * 10; }\n"
+                           "qint g(qint x) { return x + 1; }\n")
+    f = Function("f").takes(Int(), "x").returns(Int()).from_file("fg.hxx")
+    g = Function("g").takes(Int(), "x").returns(Int()).from_file("fg.hxx")
+    h = Function().takes(Int(), "x").returns(Int()).code("return x * 3;")
+    assert ctx.run(Range(3).iterate().map(f).map(h).map(g)) == [1, 31, 61]
+
+def test_translation_units_reused():
+    expr, args = make_query(5)
+    expected = Qit().run(expr, args)
+    ctx = Qit(translation_units=4)
+    expr, args = make_query()
+    ctx.run(expr, args)
+    entries = set(path for mtime, size, path in ctx.env.cache.entries())
+    # Only the unit with the changed function and the program are built
+    expr, args = make_query(5)
+    assert ctx.run(expr, args) == expected
+    new_entries = set(path for mtime, size, path in ctx.env.cache.entries())
+    assert len(new_entries - entries) == 2
+
+def test_translation_units_eviction():
+    ctx = Qit(translation_units=3, cache_size=0)
+    for modulo in (3, 5):
+        expr, args = make_query(modulo)
+        ctx.run(expr, args)
+    assert len(ctx.env.cache.entries()) == 1
+    assert len(ctx.env.units_cache.entries()) <= 1
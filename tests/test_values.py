@@ -2,6 +2,7 @@ from testutils import Qit, init
 init()
 
 from qit import Int, Range, Vector, Variable
+from qit.build.builder import CppBuilder
 
 
 def test_values_int_empty():
@@ -67,3 +68,43 @@ def test_values_product_variable():
     r = (Int() * Int()).values(x, (2,3))
     result = ctx.run(r.iterate(), args={"x": (7,5)})
     assert result == [(7,5),(2,3)]
+
+def test_values_sweep():
+    ctx = Qit()
+    x = Variable(Int(), "x")
+    r = Int().values(x, 7)
+    results = ctx.sweep(r.iterate(), [ {"x": 1}, {"x": 2} ])
+    assert results == [ [1, 7], [2, 7] ]
+
+def test_values_many():
+    ctx = Qit()
+    values = [ (i * 7919) % 10007 for i in range(20000) ]
+    v = Int().values(*values)
+    assert ctx.run(v.iterate()) == values
+    assert all(i in values for i in ctx.run(v.generate().take(100)))
+
+def test_values_many_with_variable():
+    ctx = Qit()
+    x = Variable(Int(), "x")
+    values = [ (i * 7919) % 10007 for i in range(20000) ]
+    v = Int().values(*(values + [x]))
+    builder = CppBuilder(ctx.env)
+    builder.build_collect(v.iterate().get_expression(), {})
+    # Constants are still in a static array
+    assert "static const qint values[]" in builder.get_string()
+    assert ctx.run(v.iterate(), args={"x": -1}) == values + [-1]
+
+def test_values_library():
+    # Each library has its own static arrays of values
+    ctx = Qit(execution="library")
+    p = Int() * Int()
+    assert ctx.run(p.values((1, 2), (3, 4)).iterate()) == [(1, 2), (3, 4)]
+    assert ctx.run(p.values((5, 6), (7, 8), (9, 0)).iterate()) == \
+        [(5, 6), (7, 8), (9, 0)]
+    s = Vector(p)
+    s1 = [(1, 1), (2, 2)]
+    s2 = [(3, 3)]
+    assert ctx.run(s.values(s1, s2).iterate()) == [s1, s2]
+    assert ctx.run(s.values(s2, [], s1, s2).iterate()) == [s2, [], s1, s2]
+    values = list(range(100, 0, -3))
+    assert ctx.run(Int().values(*values).iterate()) == values
@@ -16,6 +16,9 @@ def init():
 def cleanup_build_dir():
     if os.path.isdir(BUILD_DIR):
         for item in os.listdir(BUILD_DIR):
+            if item == "pch":
+                # Precompiled headers do not depend on tests, keep them
+                continue
             path = os.path.join(BUILD_DIR, item)
             if os.path.isfile(path):
                 os.unlink(path)
@@ -32,10 +35,11 @@ def make_file_in_build_dir(filename, content=""):
     with get_file_in_build_dir(filename, "w") as f:
         f.write(content)
 
-def Qit(create_files=False):
+def Qit(create_files=False, **kw):
     cleanup_build_dir()
     import qit
-    return qit.Qit(debug=True,
-                   create_files=create_files,
+    kw.setdefault("debug", True)
+    return qit.Qit(create_files=create_files,
                    build_dir=BUILD_DIR,
-                   source_dir=BUILD_DIR)
+                   source_dir=BUILD_DIR,
+                   **kw)